@@ -3,9 +3,132 @@
 
 """Frequenz Resampling Python Bindings."""
 
-from ._rust_backend import (  # noqa: F401, F403 # pylint: disable=E0401
-    Resampler,
-    ResamplingFunction,
-)
+from datetime import datetime, timedelta, timezone
+from typing import Iterable
 
-__all__ = ["Resampler", "ResamplingFunction"]
+import numpy as np
+import numpy.typing as npt
+
+try:
+    from ._rust_backend import (  # noqa: F401, F403 # pylint: disable=E0401
+        Resampler,
+        ResamplingFunction,
+    )
+except ImportError:
+    # Fall back to the pure-Python implementation on platforms where no
+    # wheel with the Rust extension is available; it implements the same
+    # algorithm and API, just slower.
+    from ._python_backend import (  # type: ignore[assignment] # noqa: F401
+        Resampler,
+        ResamplingFunction,
+    )
+
+__all__ = [
+    "Resampler",
+    "ResamplingFunction",
+    "timestamp_range_to_nanoseconds",
+    "timestamp_to_nanoseconds",
+    "timestamps_to_nanoseconds",
+]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _delta_to_nanoseconds(delta: timedelta) -> int:
+    """Convert a timedelta to nanoseconds.
+
+    Args:
+        delta: The timedelta to convert.
+
+    Returns:
+        The timedelta as nanoseconds.
+    """
+    return (
+        delta.days * 86_400 + delta.seconds
+    ) * 1_000_000_000 + delta.microseconds * 1_000
+
+
+def _to_nanoseconds(timestamp: datetime) -> int:
+    """Convert a timezone-aware timestamp to nanoseconds since the UNIX epoch.
+
+    Args:
+        timestamp: The timestamp to convert.
+
+    Returns:
+        The timestamp as nanoseconds since the UNIX epoch.
+    """
+    return _delta_to_nanoseconds(timestamp - _EPOCH)
+
+
+def timestamp_to_nanoseconds(timestamp: datetime) -> int:
+    """Convert a timezone-aware timestamp to nanoseconds since the UNIX epoch.
+
+    The resulting integer can be passed to
+    [`Resampler.push_sample_ns`][frequenz.resampling.Resampler.push_sample_ns],
+    which skips the `datetime` conversion that
+    [`push_sample`][frequenz.resampling.Resampler.push_sample] performs on
+    every call.
+
+    The conversion uses integer arithmetic, so no timestamp precision is lost
+    (unlike `datetime.timestamp()` based conversions, which go through a
+    `float` with less than nanosecond resolution for current dates).
+
+    Args:
+        timestamp: The timestamp to convert.
+
+    Returns:
+        The timestamp as nanoseconds since the UNIX epoch.
+    """
+    return _to_nanoseconds(timestamp)
+
+
+def timestamps_to_nanoseconds(
+    timestamps: Iterable[datetime],
+) -> npt.NDArray[np.int64]:
+    """Convert timezone-aware timestamps to an array of nanosecond timestamps.
+
+    The resulting array can be passed to
+    [`Resampler.push_samples`][frequenz.resampling.Resampler.push_samples],
+    which pushes a whole batch of samples in a single call instead of
+    crossing the Python/Rust boundary once per sample.
+
+    The conversion uses integer arithmetic, so no timestamp precision is lost
+    (unlike `datetime.timestamp()` based conversions, which go through a
+    `float` with less than nanosecond resolution for current dates).
+
+    Args:
+        timestamps: The timestamps to convert.
+
+    Returns:
+        An `int64` array with the timestamps as nanoseconds since the UNIX
+            epoch.
+    """
+    return np.fromiter(
+        (_to_nanoseconds(timestamp) for timestamp in timestamps), dtype=np.int64
+    )
+
+
+def timestamp_range_to_nanoseconds(
+    start: datetime, step: timedelta, count: int
+) -> npt.NDArray[np.int64]:
+    """Build an array of equally spaced nanosecond timestamps.
+
+    This is equivalent to
+    `timestamps_to_nanoseconds(start + i * step for i in range(count))` but
+    vectorized: no per-sample `datetime` or `timedelta` object is created,
+    which makes it the natural companion of
+    [`Resampler.push_samples`][frequenz.resampling.Resampler.push_samples]
+    for regularly sampled streams.
+
+    Args:
+        start: The timestamp of the first sample.
+        step: The time step between consecutive samples.
+        count: The number of timestamps to generate.
+
+    Returns:
+        An `int64` array with the timestamps as nanoseconds since the UNIX
+            epoch.
+    """
+    return _to_nanoseconds(start) + np.arange(
+        count, dtype=np.int64
+    ) * _delta_to_nanoseconds(step)
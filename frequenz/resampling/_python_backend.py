@@ -0,0 +1,458 @@
+# License: MIT
+# Copyright © 2024 Frequenz Energy-as-a-Service GmbH
+
+"""Pure-Python fallback backend for the resampler.
+
+This module mirrors the API of the Rust `_rust_backend` extension and is used
+in its place when the extension is not available for the current platform
+(see `frequenz.resampling.__init__`). It implements the same resampling
+algorithm on plain Python data structures, so results are identical to the
+Rust backend, just slower.
+"""
+
+import datetime as dt
+import logging
+import math
+from enum import Enum, unique
+from typing import Optional
+
+import numpy as np
+import numpy.typing as npt
+
+__all__ = ["Resampler", "ResamplingFunction"]
+
+_logger = logging.getLogger(__name__)
+
+_EPOCH = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+
+
+@unique
+class ResamplingFunction(Enum):
+    """The resampling functions that can be used to resample a time series."""
+
+    Average = 0
+    """Calculates the average of all samples in the time step (ignoring None values)"""
+    Sum = 1
+    """Calculates the sum of all samples in the time step (ignoring None values)"""
+    Max = 2
+    """Calculates the maximum of all samples in the time step"""
+    Min = 3
+    """Calculates the minimum of all samples in the time step"""
+    Last = 4
+    """Returns the last sample in the time step"""
+    Count = 5
+    """Counts the number of samples in the time step"""
+    First = 6
+    """Returns the first sample in the time step"""
+    Coalesce = 7
+    """Returns the first non-None sample in the time step"""
+
+    @staticmethod
+    def values() -> list[int]:
+        """Return a list of all values of the enum.
+
+        Returns:
+            A list of all values of the enum.
+        """
+        return list(_VALUES)
+
+    @staticmethod
+    def members() -> list[tuple[str, int]]:
+        """Return a list of all members of the enum.
+
+        Returns:
+            A list of all members of the enum.
+        """
+        return list(_MEMBERS)
+
+
+# The members are known at import time, so the lists are built once and every
+# values()/members() call returns a shallow copy of the cached list; the copy
+# keeps callers that mutate the result from corrupting the cache.
+_VALUES = [function.value for function in ResamplingFunction]
+_MEMBERS = [(function.name, function.value) for function in ResamplingFunction]
+
+
+def _to_nanoseconds(timestamp: dt.datetime) -> int:
+    """Convert a timezone-aware timestamp to nanoseconds since the UNIX epoch.
+
+    Args:
+        timestamp: The timestamp to convert.
+
+    Returns:
+        The timestamp as nanoseconds since the UNIX epoch.
+    """
+    delta = timestamp - _EPOCH
+    return (
+        delta.days * 86_400 + delta.seconds
+    ) * 1_000_000_000 + delta.microseconds * 1_000
+
+
+def _to_datetime(timestamp_ns: int) -> dt.datetime:
+    """Convert nanoseconds since the UNIX epoch to a timezone-aware timestamp.
+
+    Args:
+        timestamp_ns: The timestamp as nanoseconds since the UNIX epoch.
+
+    Returns:
+        The timestamp as a timezone-aware datetime.
+    """
+    return _EPOCH + dt.timedelta(microseconds=timestamp_ns // 1_000)
+
+
+def _average(values: list[float]) -> Optional[float]:
+    """Return the average of the non-NaN values, or None if there are none.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The average of the non-NaN values.
+    """
+    valid = [value for value in values if not math.isnan(value)]
+    if not valid:
+        return None
+    return sum(valid) / len(valid)
+
+
+def _sum(values: list[float]) -> Optional[float]:
+    """Return the sum of the non-NaN values, or None if there are none.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The sum of the non-NaN values.
+    """
+    valid = [value for value in values if not math.isnan(value)]
+    if not valid:
+        return None
+    return sum(valid)
+
+
+def _max(values: list[float]) -> Optional[float]:
+    """Return the maximum of the non-NaN values, or None if there are none.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The maximum of the non-NaN values.
+    """
+    valid = [value for value in values if not math.isnan(value)]
+    if not valid:
+        return None
+    return max(valid)
+
+
+def _min(values: list[float]) -> Optional[float]:
+    """Return the minimum of the non-NaN values, or None if there are none.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The minimum of the non-NaN values.
+    """
+    valid = [value for value in values if not math.isnan(value)]
+    if not valid:
+        return None
+    return min(valid)
+
+
+def _first(values: list[float]) -> Optional[float]:
+    """Return the first value, or None if it is NaN or there are no values.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The first value.
+    """
+    if not values or math.isnan(values[0]):
+        return None
+    return values[0]
+
+
+def _last(values: list[float]) -> Optional[float]:
+    """Return the last value, or None if it is NaN or there are no values.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The last value.
+    """
+    if not values or math.isnan(values[-1]):
+        return None
+    return values[-1]
+
+
+def _coalesce(values: list[float]) -> Optional[float]:
+    """Return the first non-NaN value, or None if there are none.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The first non-NaN value.
+    """
+    return next((value for value in values if not math.isnan(value)), None)
+
+
+def _count(values: list[float]) -> Optional[float]:
+    """Return the number of non-NaN values.
+
+    Args:
+        values: The values of a bucket window.
+
+    Returns:
+        The number of non-NaN values.
+    """
+    return float(sum(1 for value in values if not math.isnan(value)))
+
+
+_RESAMPLING_FUNCTIONS = {
+    ResamplingFunction.Average: _average,
+    ResamplingFunction.Sum: _sum,
+    ResamplingFunction.Max: _max,
+    ResamplingFunction.Min: _min,
+    ResamplingFunction.Last: _last,
+    ResamplingFunction.Count: _count,
+    ResamplingFunction.First: _first,
+    ResamplingFunction.Coalesce: _coalesce,
+}
+
+
+class Resampler:
+    """Resample a time series of samples.
+
+    It stores the samples in a buffer and resamples the samples in the buffer
+    when the resample method is called.
+    A resampler can be configured with a resampling function and a resampling
+    interval.
+    """
+
+    def __init__(
+        self,
+        interval: dt.timedelta,
+        resampling_function: ResamplingFunction,
+        *,
+        max_age_in_intervals: int,
+        start: dt.datetime,
+        first_timestamp: bool = True,
+    ):
+        """Initialize a new Resampler object.
+
+        Args:
+            interval: The resampling interval.
+            resampling_function: The resampling function.
+            max_age_in_intervals: The maximum age of a sample in intervals.
+            start: The start time of the resampling.
+            first_timestamp: Whether the resampled timestamp should be the first
+                timestamp in the buffer or the last timestamp in the buffer.
+                Defaults to `True`.
+        """
+        interval_ns = round(interval.total_seconds() * 1_000_000_000)
+        interval_ms = interval_ns // 1_000_000
+        # Align the start to the epoch of the resampling interval, with
+        # millisecond granularity like the Rust backend.
+        start_ms = _to_nanoseconds(start) // 1_000_000
+        self._interval_ns = interval_ns
+        self._resampling_function = _RESAMPLING_FUNCTIONS[
+            ResamplingFunction(resampling_function.value)
+        ]
+        self._max_age_in_intervals = max_age_in_intervals
+        # Python's `//` floors while the Rust backend's integer division
+        # truncates toward zero, which differs for pre-epoch starts.
+        aligned = start_ms // interval_ms
+        if start_ms < 0 and start_ms % interval_ms:
+            aligned += 1
+        self._start_ns = aligned * interval_ms * 1_000_000
+        self._first_timestamp = first_timestamp
+        self._timestamps: list[int] = []
+        self._values: list[float] = []
+        self._input_interval_ns: Optional[int] = None
+
+    def push_sample(self, *, timestamp: dt.datetime, value: Optional[float]) -> None:
+        """Push a new sample into the resampler buffer.
+
+        Args:
+            timestamp: The timestamp of the sample.
+            value: The value of the sample. NaN values are treated as missing
+                (`None`) samples.
+        """
+        self.push_sample_ns(
+            timestamp_ns=_to_nanoseconds(timestamp),
+            value=math.nan if value is None else float(value),
+        )
+
+    def push_sample_ns(self, *, timestamp_ns: int, value: float) -> None:
+        """Push a new sample with a nanosecond timestamp into the resampler buffer.
+
+        Args:
+            timestamp_ns: The timestamp of the sample, as nanoseconds since
+                the UNIX epoch.
+            value: The value of the sample. A NaN value encodes a missing
+                (`None`) sample.
+        """
+        self._timestamps.append(timestamp_ns)
+        self._values.append(value)
+
+    def push_samples(
+        self,
+        *,
+        timestamps: npt.NDArray[np.int64],
+        values: npt.NDArray[np.float64],
+    ) -> None:
+        """Push a batch of samples into the resampler buffer in a single call.
+
+        Args:
+            timestamps: The timestamps of the samples, as nanoseconds since
+                the UNIX epoch.
+            values: The values of the samples. NaN values are treated as
+                missing (`None`) samples.
+
+        Raises:
+            ValueError: If the timestamps and values have different lengths.
+        """
+        if len(timestamps) != len(values):
+            raise ValueError("timestamps and values must have the same length")
+        self._timestamps.extend(int(timestamp) for timestamp in timestamps)
+        self._values.extend(float(value) for value in values)
+
+    def resample(
+        self, end: dt.datetime | None = None
+    ) -> list[tuple[dt.datetime, Optional[float]]]:
+        """Resample the samples in the buffer until the given end time.
+
+        Args:
+            end: The end time of the resampling. If `None` the samples in the buffer will be
+                resampled until the current date/time.
+
+        Returns:
+            A list of tuples with the resampled samples.
+        """
+        if end is None:
+            end = dt.datetime.now(dt.timezone.utc)
+        end_ns = _to_nanoseconds(end)
+        if self._start_ns >= end_ns:
+            _logger.warning("start time is greater or equal to end time")
+            return []
+        res: list[tuple[dt.datetime, Optional[float]]] = []
+        # The bucket window is the contiguous slice [window_start, window_end)
+        # of the buffer; samples enter it at the back and are evicted by
+        # advancing the front.
+        window_start = 0
+        window_end = 0
+        input_start_ns = self._timestamps[0] if self._timestamps else None
+        offset_ns = 0 if self._first_timestamp else self._interval_ns
+        max_age_ns = (
+            self._input_interval_ns or self._interval_ns
+        ) * self._max_age_in_intervals
+
+        # loop over the intervals
+        while self._start_ns < end_ns:
+            edge_ns = self._start_ns + self._interval_ns
+            # add the samples that are not newer than the current interval to
+            # the window
+            while window_end < len(self._timestamps) and self._is_left_of_edge(
+                self._timestamps[window_end], edge_ns
+            ):
+                # update the input interval to adapt the resampling interval
+                # to the input data
+                if input_start_ns is not None and self._input_interval_ns is None:
+                    self._input_interval_ns = max(
+                        self._timestamps[window_end] - input_start_ns,
+                        self._interval_ns,
+                    )
+                    max_age_ns = self._input_interval_ns * self._max_age_in_intervals
+                window_end += 1
+
+            # Evict samples from the window that are older than max_age
+            drain_end_ns = edge_ns - max_age_ns
+            while window_start < window_end and not self._is_right_of_edge(
+                self._timestamps[window_start], drain_end_ns
+            ):
+                window_start += 1
+
+            # resample the window
+            res.append(
+                (
+                    _to_datetime(self._start_ns + offset_ns),
+                    self._resampling_function(self._values[window_start:window_end]),
+                )
+            )
+
+            # Go to the next interval
+            self._start_ns = edge_ns
+
+        # Evict samples from the buffer that are older than max_age
+        drain_end_ns = end_ns - max_age_ns
+        head = 0
+        while head < len(self._timestamps) and not self._is_right_of_edge(
+            self._timestamps[head], drain_end_ns
+        ):
+            head += 1
+        del self._timestamps[:head]
+        del self._values[:head]
+
+        return res
+
+    def resample_arrays(
+        self, end: dt.datetime | None = None
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+        """Resample the samples in the buffer, returning NumPy arrays.
+
+        This is equivalent to `resample`, but returns a timestamp array and a
+        value array instead of a list of tuples.
+
+        Args:
+            end: The end time of the resampling. If `None` the samples in the buffer will be
+                resampled until the current date/time.
+
+        Returns:
+            A tuple with an array of the resampled timestamps, as nanoseconds
+                since the UNIX epoch, and an array of the resampled values,
+                with NaN encoding a missing (`None`) value.
+        """
+        resampled = self.resample(end)
+        timestamps = np.fromiter(
+            (_to_nanoseconds(timestamp) for timestamp, _ in resampled),
+            dtype=np.int64,
+            count=len(resampled),
+        )
+        values = np.fromiter(
+            (math.nan if value is None else value for _, value in resampled),
+            dtype=np.float64,
+            count=len(resampled),
+        )
+        return timestamps, values
+
+    def _is_left_of_edge(self, timestamp_ns: int, edge_ns: int) -> bool:
+        """Return whether a sample timestamp falls before an interval edge.
+
+        Args:
+            timestamp_ns: The timestamp of the sample.
+            edge_ns: The edge of the interval.
+
+        Returns:
+            Whether the sample falls before the edge.
+        """
+        if self._first_timestamp:
+            return timestamp_ns < edge_ns
+        return timestamp_ns <= edge_ns
+
+    def _is_right_of_edge(self, timestamp_ns: int, edge_ns: int) -> bool:
+        """Return whether a sample timestamp falls after an eviction edge.
+
+        Args:
+            timestamp_ns: The timestamp of the sample.
+            edge_ns: The edge of the eviction.
+
+        Returns:
+            Whether the sample falls after the edge.
+        """
+        if self._first_timestamp:
+            return timestamp_ns >= edge_ns
+        return timestamp_ns > edge_ns
@@ -1,12 +1,15 @@
 # License: MIT
 # Copyright © 2024 Frequenz Energy-as-a-Service GmbH
 
-__all__ = "Resampler", "ResamplingFunction"
+__all__ = "GroupedResampler", "Resampler", "ResamplingFunction"
 
 from datetime import datetime, timedelta
 from enum import Enum, unique
 from typing import Optional
 
+import numpy as np
+import numpy.typing as npt
+
 @unique
 class ResamplingFunction(Enum):
     """
@@ -86,7 +89,47 @@ class Resampler:
 
         Args:
             timestamp: The timestamp of the sample.
-            value: The value of the sample.
+            value: The value of the sample. NaN values are treated as missing
+                (`None`) samples.
+        """
+
+    def push_sample_ns(self, *, timestamp_ns: int, value: float) -> None:
+        """
+        Pushes a new sample with a nanosecond timestamp into the resampler buffer.
+
+        This is faster than
+        [`push_sample`][frequenz.resampling.Resampler.push_sample], as no
+        `datetime` object has to be converted on the way in (see
+        [`timestamp_to_nanoseconds`][frequenz.resampling.timestamp_to_nanoseconds])
+        and no `Optional` has to be unwrapped; both arguments are stored in
+        the buffer as they are.
+
+        Args:
+            timestamp_ns: The timestamp of the sample, as nanoseconds since
+                the UNIX epoch.
+            value: The value of the sample. A NaN value encodes a missing
+                (`None`) sample.
+        """
+
+    def push_samples(
+        self,
+        *,
+        timestamps: npt.NDArray[np.int64],
+        values: npt.NDArray[np.float64],
+    ) -> None:
+        """
+        Pushes a batch of samples into the resampler buffer in a single call.
+
+        This is considerably faster than calling
+        [`push_sample`][frequenz.resampling.Resampler.push_sample] in a loop,
+        as the Python/Rust boundary is only crossed once for the whole batch.
+
+        Args:
+            timestamps: The timestamps of the samples, as nanoseconds since
+                the UNIX epoch (see
+                [`timestamps_to_nanoseconds`][frequenz.resampling.timestamps_to_nanoseconds]).
+            values: The values of the samples. NaN values are treated as
+                missing (`None`) samples.
         """
 
     def resample(
@@ -102,3 +145,107 @@ class Resampler:
         Returns:
             A list of tuples with the resampled samples.
         """
+
+    def resample_arrays(
+        self, end: datetime | None = None
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float64]]:
+        """
+        Resamples the samples in the buffer until the given end time,
+        returning NumPy arrays instead of a list of tuples.
+
+        This avoids allocating a `datetime` and a `float` Python object per
+        resampled sample, which dominates the cost of
+        [`resample`][frequenz.resampling.Resampler.resample] for long ranges.
+
+        Args:
+            end: The end time of the resampling. If `None` the samples in the buffer will be
+                resampled until the current date/time.
+
+        Returns:
+            A tuple with an array of the resampled timestamps, as nanoseconds
+                since the UNIX epoch, and an array of the resampled values,
+                with NaN encoding a missing (`None`) value.
+        """
+
+class GroupedResampler:
+    """
+    The GroupedResampler class resamples multiple keyed sample streams with a
+    shared configuration, managing one resampler per key on the Rust side.
+
+    Streams are created lazily on the first pushed sample of a key; a key
+    that first appears after some resampling has already happened starts at
+    the end time of the last resample, so all streams emit aligned buckets.
+    """
+
+    def __init__(
+        self,
+        interval: timedelta,
+        resampling_function: ResamplingFunction,
+        *,
+        max_age_in_intervals: int,
+        start: datetime,
+        first_timestamp: bool = True,
+    ):
+        """
+        Initializes a new GroupedResampler object.
+
+        Args:
+            interval: The resampling interval.
+            resampling_function: The resampling function for every stream.
+            max_age_in_intervals: The maximum age of a sample in intervals.
+            start: The start time of the resampling.
+            first_timestamp: Whether the resampled timestamp should be the first
+                timestamp in the buffer or the last timestamp in the buffer.
+                Defaults to `True`.
+        """
+
+    def push_sample(
+        self, *, key: str, timestamp: datetime, value: Optional[float]
+    ) -> None:
+        """
+        Pushes a new sample into the stream of the given key.
+
+        Args:
+            key: The key of the stream the sample belongs to.
+            timestamp: The timestamp of the sample.
+            value: The value of the sample. NaN values are treated as missing
+                (`None`) samples.
+        """
+
+    def push_samples(
+        self,
+        *,
+        keys: list[str],
+        timestamps: npt.NDArray[np.int64],
+        values: npt.NDArray[np.float64],
+    ) -> None:
+        """
+        Pushes a batch of keyed samples into the resampler in a single call.
+
+        This is considerably faster than keeping a Python dict of resamplers
+        and pushing to them one sample at a time, as the Python/Rust boundary
+        is only crossed once for the whole batch.
+
+        Args:
+            keys: The keys of the streams the samples belong to.
+            timestamps: The timestamps of the samples, as nanoseconds since
+                the UNIX epoch (see
+                [`timestamps_to_nanoseconds`][frequenz.resampling.timestamps_to_nanoseconds]).
+            values: The values of the samples. NaN values are treated as
+                missing (`None`) samples.
+        """
+
+    def resample(
+        self, end: datetime | None = None
+    ) -> dict[str, list[tuple[datetime, Optional[float]]]]:
+        """
+        Resamples all keyed streams until the given end time.
+
+        Args:
+            end: The end time of the resampling. If `None` the samples in the buffer will be
+                resampled until the current date/time.
+
+        Returns:
+            A dict mapping each key to a list of tuples with its resampled
+                samples.
+        """
@@ -0,0 +1,113 @@
+// License: MIT
+// Copyright © 2024 Frequenz Energy-as-a-Service GmbH
+
+//! The grouped module provides resampling of multiple keyed streams (e.g.
+//! one per component or metric) through a single entry point.
+
+use std::collections::HashMap;
+use std::hash::Hash;
+
+use chrono::{DateTime, TimeDelta, Utc};
+
+use crate::numeric::{NumericResampler, NumericResamplingFunction};
+
+/// The resampled samples of every keyed stream, as returned by
+/// [`GroupedResampler::resample`].
+pub type ResampledGroups<'a, K> = HashMap<&'a K, Vec<(DateTime<Utc>, Option<f64>)>>;
+
+/// The GroupedResampler resamples multiple keyed sample streams with a
+/// shared configuration, managing one [`NumericResampler`] per key.
+///
+/// Streams are created lazily on the first pushed sample of a key; a key
+/// that first appears after some resampling has already happened starts at
+/// the end time of the last resample, so all streams emit aligned buckets.
+#[derive(Debug)]
+pub struct GroupedResampler<K: Eq + Hash> {
+    /// The time step between each resampled sample.
+    interval: TimeDelta,
+    /// The resampling function to use for every stream.
+    resampling_function: NumericResamplingFunction,
+    /// The maximum age of a sample, in intervals.
+    max_age_in_intervals: i32,
+    /// The start time used for streams that have not seen a resample yet.
+    start: DateTime<Utc>,
+    /// Whether the resampled timestamp is the first or last timestamp of the
+    /// interval, see [`NumericResampler`].
+    first_timestamp: bool,
+    /// The per-key resamplers.
+    resamplers: HashMap<K, NumericResampler>,
+}
+
+impl<K: Eq + Hash> GroupedResampler<K> {
+    /// Creates a new GroupedResampler; the parameters match
+    /// [`NumericResampler::new`] and apply to every keyed stream.
+    pub fn new(
+        interval: TimeDelta,
+        resampling_function: NumericResamplingFunction,
+        max_age_in_intervals: i32,
+        start: DateTime<Utc>,
+        first_timestamp: bool,
+    ) -> Self {
+        Self {
+            interval,
+            resampling_function,
+            max_age_in_intervals,
+            start,
+            first_timestamp,
+            resamplers: HashMap::new(),
+        }
+    }
+
+    /// Adds a sample to the stream of the given key, creating the stream if
+    /// it is the first sample of the key; a `None` value is stored as NaN.
+    pub fn push(&mut self, key: K, timestamp: DateTime<Utc>, value: Option<f64>) {
+        self.resampler(key).push(timestamp, value);
+    }
+
+    /// Adds a sample with a nanosecond timestamp to the stream of the given
+    /// key; a NaN value encodes a missing value.
+    pub fn push_nanoseconds(&mut self, key: K, timestamp_ns: i64, value: f64) {
+        self.resampler(key).push_nanoseconds(timestamp_ns, value);
+    }
+
+    /// Resamples all streams until the given end time and returns the
+    /// resampled samples per key.
+    pub fn resample(&mut self, end: DateTime<Utc>) -> ResampledGroups<'_, K> {
+        // Streams created after this resample start where it ended, so
+        // their buckets line up with the existing streams.
+        self.start = self.start.max(end);
+        self.resamplers
+            .iter_mut()
+            .map(|(key, resampler)| (key, resampler.resample(end)))
+            .collect()
+    }
+
+    /// Resamples all streams until now and returns the resampled samples
+    /// per key.
+    pub fn resample_now(&mut self) -> ResampledGroups<'_, K> {
+        self.resample(Utc::now())
+    }
+
+    /// Returns the number of keyed streams.
+    pub fn len(&self) -> usize {
+        self.resamplers.len()
+    }
+
+    /// Returns whether there are no keyed streams yet.
+    pub fn is_empty(&self) -> bool {
+        self.resamplers.is_empty()
+    }
+
+    /// Returns the resampler of the given key, creating it if needed.
+    fn resampler(&mut self, key: K) -> &mut NumericResampler {
+        self.resamplers.entry(key).or_insert_with(|| {
+            NumericResampler::new(
+                self.interval,
+                self.resampling_function,
+                self.max_age_in_intervals,
+                self.start,
+                self.first_timestamp,
+            )
+        })
+    }
+}
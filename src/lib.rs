@@ -73,7 +73,11 @@ assert_eq!(resampled, expected);
 ```
 */
 
+mod grouped;
+mod numeric;
 mod resampler;
+pub mod simd;
+mod window;
 
 #[cfg(test)]
 mod tests;
@@ -81,4 +85,6 @@ mod tests;
 #[cfg(feature = "python")]
 mod python;
 
+pub use grouped::{GroupedResampler, ResampledGroups};
+pub use numeric::{NumericResampler, NumericResamplingFunction};
 pub use resampler::{Resampler, ResamplingFunction, Sample};
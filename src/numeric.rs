@@ -0,0 +1,375 @@
+// License: MIT
+// Copyright © 2024 Frequenz Energy-as-a-Service GmbH
+
+//! The numeric module provides a resampler specialized for `f64` samples.
+//!
+//! Unlike the generic [`Resampler`][crate::Resampler], which buffers
+//! `(timestamp, value)` sample structs, the [`NumericResampler`] stores its
+//! buffer as flat structure-of-arrays ring storage: one `i64` array of
+//! nanosecond timestamps and one `f64` array of values, with NaN encoding a
+//! missing (`None`) value. The samples of a bucket window are then a
+//! contiguous slice of the value array that can be handed to the
+//! [SIMD aggregation kernels][crate::simd] directly, without constructing a
+//! `DateTime` or branching on an `Option` per sample, and evicting old
+//! samples is just advancing the start index of the window.
+//!
+//! The resampling semantics are identical to the generic resampler; the
+//! tests keep both implementations in lockstep.
+
+use chrono::{DateTime, TimeDelta, Utc};
+use log::warn;
+
+use crate::resampler::{epoch_align, is_left_of_buffer_edge, is_right_of_buffer_edge};
+use crate::simd::{self, Stats};
+
+/// The number of samples per temporal chunk for which the statistics are
+/// precomputed when resampling with long windows; sized so a chunk of values
+/// fits comfortably in L1 cache.
+const CHUNK_LEN: usize = 256;
+
+/// The window length (in samples) from which the decomposable resampling
+/// functions switch from scanning every sample of the window to combining
+/// precomputed per-chunk statistics. Below this the chunks would mostly be
+/// window edges, which have to be scanned anyway.
+const CHUNKED_MIN_WINDOW: usize = 2 * CHUNK_LEN;
+
+/// The resampling functions supported by the [`NumericResampler`].
+///
+/// The semantics match the variants of
+/// [`ResamplingFunction`][crate::ResamplingFunction] of the same name, with
+/// NaN values treated as missing (`None`) samples.
+#[derive(Clone, Copy, Debug, Default, PartialEq, Eq)]
+pub enum NumericResamplingFunction {
+    /// Calculates the average of all samples in the time step (ignoring NaN
+    /// values)
+    #[default]
+    Average,
+    /// Calculates the sum of all samples in the time step (ignoring NaN
+    /// values)
+    Sum,
+    /// Calculates the maximum value of all samples in the time step (ignoring
+    /// NaN values)
+    Max,
+    /// Calculates the minimum value of all samples in the time step (ignoring
+    /// NaN values)
+    Min,
+    /// Uses the first sample in the time step. If the first sample is NaN,
+    /// the resampling function will return None.
+    First,
+    /// Uses the last sample in the time step. If the last sample is NaN, the
+    /// resampling function will return None.
+    Last,
+    /// Returns the first non-NaN sample in the time step. If all samples are
+    /// NaN, the resampling function will return None.
+    Coalesce,
+    /// Counts the number of non-NaN samples in the time step.
+    Count,
+}
+
+impl NumericResamplingFunction {
+    /// Applies the resampling function to the values of a bucket window.
+    fn apply(&self, values: &[f64]) -> Option<f64> {
+        match self {
+            Self::Average => simd::stats(values).average(),
+            Self::Sum => simd::sum(values),
+            Self::Max => simd::max(values),
+            Self::Min => simd::min(values),
+            Self::First => values.first().copied().filter(|v| !v.is_nan()),
+            Self::Last => values.last().copied().filter(|v| !v.is_nan()),
+            Self::Coalesce => values.iter().copied().find(|v| !v.is_nan()),
+            Self::Count => Some(simd::count(values) as f64),
+        }
+    }
+
+    /// Returns whether the function can be computed by merging per-chunk
+    /// sample statistics instead of scanning every sample of the window.
+    fn is_decomposable(&self) -> bool {
+        matches!(
+            self,
+            Self::Average | Self::Sum | Self::Max | Self::Min | Self::Count
+        )
+    }
+
+    /// Applies the resampling function to the merged statistics of a bucket
+    /// window; only meaningful for [decomposable][Self::is_decomposable]
+    /// functions, the positional ones return `None`.
+    fn apply_stats(&self, stats: Stats) -> Option<f64> {
+        match self {
+            Self::Average => stats.average(),
+            Self::Sum => stats.sum(),
+            Self::Max => stats.max(),
+            Self::Min => stats.min(),
+            Self::Count => Some(stats.count() as f64),
+            Self::First | Self::Last | Self::Coalesce => None,
+        }
+    }
+}
+
+/// The NumericResampler resamples a time series of `f64` samples, storing
+/// the buffered samples in flat structure-of-arrays buffers.
+///
+/// It mirrors the behaviour of the generic [`Resampler`][crate::Resampler]
+/// (same constructor parameters, same emitted buckets), working on `i64`
+/// nanosecond timestamps and NaN-encoded values internally.
+#[derive(Debug, Default)]
+pub struct NumericResampler {
+    /// The time step between each resampled sample, in nanoseconds.
+    interval_ns: i64,
+    /// The resampling function to use.
+    resampling_function: NumericResamplingFunction,
+    /// The timestamps of the buffered samples, as nanoseconds since the UNIX
+    /// epoch, in push order.
+    timestamps: Vec<i64>,
+    /// The values of the buffered samples; NaN encodes a missing value.
+    values: Vec<f64>,
+    /// The index of the first live sample in the buffers; samples before it
+    /// have been evicted without moving the arrays.
+    head: usize,
+    /// Resample the data in the buffer that is not older than
+    /// max_age_in_intervals. Number of intervals. If set to 0, all samples
+    /// are skipped.
+    max_age_in_intervals: i32,
+    /// The start time of the resampling, in nanoseconds since the UNIX epoch.
+    start_ns: i64,
+    /// The timestamp of the first sample in the buffer.
+    input_start_ns: Option<i64>,
+    /// The interval between the first and the second sample in the buffer.
+    input_interval_ns: Option<i64>,
+    /// Whether the resampled timestamp should be the first timestamp (if
+    /// `first_timestamp` is `true`) or the last timestamp (if
+    /// `first_timestamp` is `false`) of the interval.
+    first_timestamp: bool,
+}
+
+impl NumericResampler {
+    /// Creates a new NumericResampler with the given resampling interval and
+    /// resampling function.
+    pub fn new(
+        interval: TimeDelta,
+        resampling_function: NumericResamplingFunction,
+        max_age_in_intervals: i32,
+        start: DateTime<Utc>,
+        first_timestamp: bool,
+    ) -> Self {
+        let aligned_start = epoch_align(interval, start, None);
+        Self {
+            interval_ns: nanoseconds(interval),
+            resampling_function,
+            max_age_in_intervals,
+            start_ns: datetime_to_nanoseconds(aligned_start),
+            first_timestamp,
+            ..Default::default()
+        }
+    }
+
+    /// Adds a sample to the buffer; a `None` value is stored as NaN.
+    pub fn push(&mut self, timestamp: DateTime<Utc>, value: Option<f64>) {
+        self.push_nanoseconds(
+            datetime_to_nanoseconds(timestamp),
+            value.unwrap_or(f64::NAN),
+        );
+    }
+
+    /// Adds a sample with a nanosecond timestamp to the buffer; a NaN value
+    /// encodes a missing value.
+    pub fn push_nanoseconds(&mut self, timestamp_ns: i64, value: f64) {
+        self.timestamps.push(timestamp_ns);
+        self.values.push(value);
+    }
+
+    /// Returns the number of samples currently in the buffer.
+    pub fn len(&self) -> usize {
+        self.timestamps.len() - self.head
+    }
+
+    /// Returns whether the buffer is empty.
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+
+    /// Resamples the samples in the buffer and returns the resampled samples
+    /// until the given end time.
+    pub fn resample(&mut self, end: DateTime<Utc>) -> Vec<(DateTime<Utc>, Option<f64>)> {
+        let (timestamps, values) = self.resample_nanoseconds(datetime_to_nanoseconds(end));
+        timestamps
+            .into_iter()
+            .zip(values)
+            .map(|(timestamp_ns, value)| {
+                (
+                    nanoseconds_to_datetime(timestamp_ns),
+                    (!value.is_nan()).then_some(value),
+                )
+            })
+            .collect()
+    }
+
+    /// Resamples the samples in the buffer and returns the resampled samples
+    /// until the given end time, as flat arrays of nanosecond timestamps and
+    /// values, with NaN encoding a missing value.
+    pub fn resample_nanoseconds(&mut self, end_ns: i64) -> (Vec<i64>, Vec<f64>) {
+        if self.start_ns >= end_ns {
+            warn!("start time is greater or equal to end time");
+            return (vec![], vec![]);
+        }
+        // The number of emitted samples is known upfront, so the result
+        // vectors are sized in a single allocation each.
+        let intervals = if self.interval_ns > 0 {
+            ((end_ns - self.start_ns + self.interval_ns - 1) / self.interval_ns).max(0) as usize
+        } else {
+            0
+        };
+        let mut res_timestamps = Vec::with_capacity(intervals);
+        let mut res_values = Vec::with_capacity(intervals);
+        // The bucket window is the contiguous slice [window_start, window_end)
+        // of the buffers; samples enter it at the back and are evicted by
+        // advancing the front.
+        let mut window_start = self.head;
+        let mut window_end = self.head;
+        // For long windows, the statistics of fixed temporal chunks of the
+        // buffer are precomputed (lazily, on the first long window) so each
+        // interval merges whole-chunk statistics for the interior of its
+        // window and only scans the samples at the window edges.
+        let decomposable = self.resampling_function.is_decomposable();
+        let mut chunk_stats: Option<Vec<Stats>> = None;
+        self.input_start_ns = self.timestamps.get(self.head).copied();
+        let offset_ns = if self.first_timestamp {
+            0
+        } else {
+            self.interval_ns
+        };
+        // The maximum age of a sample in nanoseconds; it only changes when
+        // the input interval is adapted to the first consumed sample, so it
+        // is kept as a running value instead of being multiplied out again
+        // for every interval.
+        let max_age_intervals = i64::from(self.max_age_in_intervals);
+        let mut max_age_ns = self.input_interval_ns.unwrap_or(self.interval_ns) * max_age_intervals;
+
+        // loop over the intervals
+        while self.start_ns < end_ns {
+            let edge_ns = self.start_ns + self.interval_ns;
+            // add the samples that are not newer than the current interval to
+            // the window
+            while self
+                .timestamps
+                .get(window_end)
+                .map(|timestamp_ns| {
+                    is_left_of_buffer_edge(self.first_timestamp, timestamp_ns, &edge_ns)
+                })
+                .unwrap_or(false)
+            {
+                // update the input_start and input_interval to adapt
+                // the resampling interval to the input data
+                if let Some(input_start_ns) = self.input_start_ns {
+                    if self.input_interval_ns.is_none() {
+                        let input_interval_ns =
+                            (self.timestamps[window_end] - input_start_ns).max(self.interval_ns);
+                        self.input_interval_ns = Some(input_interval_ns);
+                        max_age_ns = input_interval_ns * max_age_intervals;
+                    }
+                }
+                window_end += 1;
+            }
+
+            // Evict samples from the window that are older than max_age
+            let drain_end_ns = edge_ns - max_age_ns;
+            while window_start < window_end
+                && !is_right_of_buffer_edge(
+                    self.first_timestamp,
+                    &self.timestamps[window_start],
+                    &drain_end_ns,
+                )
+            {
+                window_start += 1;
+            }
+
+            // resample the window
+            let value = if decomposable && window_end - window_start >= CHUNKED_MIN_WINDOW {
+                let chunk_stats = chunk_stats.get_or_insert_with(|| {
+                    self.values.chunks(CHUNK_LEN).map(simd::stats).collect()
+                });
+                self.resampling_function.apply_stats(stats_of_range(
+                    &self.values,
+                    chunk_stats,
+                    window_start,
+                    window_end,
+                ))
+            } else {
+                self.resampling_function
+                    .apply(&self.values[window_start..window_end])
+            };
+            res_timestamps.push(self.start_ns + offset_ns);
+            res_values.push(value.unwrap_or(f64::NAN));
+
+            // Go to the next interval
+            self.start_ns = edge_ns;
+        }
+
+        // Evict samples from the buffer that are older than max_age
+        let drain_end_ns = end_ns - max_age_ns;
+        while self.head < self.timestamps.len()
+            && !is_right_of_buffer_edge(
+                self.first_timestamp,
+                &self.timestamps[self.head],
+                &drain_end_ns,
+            )
+        {
+            self.head += 1;
+        }
+        // Compact the buffers only once the dead prefix is at least as large
+        // as the live part, so eviction is normally just the index bump above
+        // and the memmove cost is amortized over the retained samples. The
+        // live samples stay contiguous either way, which is what the SIMD
+        // kernels need.
+        if self.head * 2 >= self.timestamps.len() {
+            self.timestamps.drain(..self.head);
+            self.values.drain(..self.head);
+            self.head = 0;
+        }
+
+        (res_timestamps, res_values)
+    }
+
+    /// Resamples the samples in the buffer and returns the resampled samples
+    /// until now.
+    pub fn resample_now(&mut self) -> Vec<(DateTime<Utc>, Option<f64>)> {
+        self.resample(Utc::now())
+    }
+}
+
+/// Merges the statistics of the values in `[start, end)`, combining the
+/// precomputed per-chunk statistics for the chunks that lie fully inside the
+/// range and scanning only the partial chunks at the edges.
+fn stats_of_range(values: &[f64], chunk_stats: &[Stats], start: usize, end: usize) -> Stats {
+    let first_full = start.div_ceil(CHUNK_LEN);
+    let last_full = end / CHUNK_LEN;
+    if first_full >= last_full {
+        return simd::stats(&values[start..end]);
+    }
+    let mut stats = simd::stats(&values[start..first_full * CHUNK_LEN]);
+    for chunk in &chunk_stats[first_full..last_full] {
+        stats = Stats::merge(stats, *chunk);
+    }
+    Stats::merge(stats, simd::stats(&values[last_full * CHUNK_LEN..end]))
+}
+
+/// Returns the number of nanoseconds of a TimeDelta.
+fn nanoseconds(delta: TimeDelta) -> i64 {
+    delta.num_nanoseconds().unwrap_or(i64::MAX)
+}
+
+/// Converts a timestamp to nanoseconds since the UNIX epoch, saturating at
+/// the representable range (about the years 1677 to 2262).
+pub(crate) fn datetime_to_nanoseconds(timestamp: DateTime<Utc>) -> i64 {
+    timestamp.timestamp_nanos_opt().unwrap_or_else(|| {
+        if timestamp.timestamp() > 0 {
+            i64::MAX
+        } else {
+            i64::MIN
+        }
+    })
+}
+
+/// Converts nanoseconds since the UNIX epoch to a timestamp.
+fn nanoseconds_to_datetime(timestamp_ns: i64) -> DateTime<Utc> {
+    DateTime::from_timestamp_nanos(timestamp_ns)
+}
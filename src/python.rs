@@ -1,39 +1,16 @@
-use crate::{resampler::Resampler, ResamplingFunction, Sample};
+use crate::numeric::datetime_to_nanoseconds;
+use crate::{GroupedResampler, NumericResampler, NumericResamplingFunction};
 use chrono::{DateTime, TimeDelta, Utc};
-use pyo3::{exceptions::PyValueError, prelude::*};
+use numpy::{IntoPyArray, PyArray1, PyReadonlyArray1};
+use pyo3::types::{PyList, PyString};
+use pyo3::{exceptions::PyValueError, intern, prelude::*};
+use std::collections::HashMap;
 use std::fmt::Display;
-
-#[derive(Default, Clone, Debug, Copy)]
-struct PythonSample {
-    timestamp: DateTime<Utc>,
-    value: Option<f32>,
-}
-
-impl PythonSample {
-    fn to_tuple(self) -> (DateTime<Utc>, Option<f32>) {
-        (self.timestamp, self.value)
-    }
-}
-
-impl Sample for PythonSample {
-    type Value = f32;
-
-    fn new(timestamp: DateTime<Utc>, value: Option<f32>) -> Self {
-        Self { timestamp, value }
-    }
-
-    fn timestamp(&self) -> DateTime<Utc> {
-        self.timestamp
-    }
-
-    fn value(&self) -> Option<f32> {
-        self.value
-    }
-}
+use std::sync::OnceLock;
 
 #[pyclass(eq, eq_int, name = "ResamplingFunction")]
 #[derive(Clone, Debug, Copy, PartialEq)]
-enum ResamplingFunctionF32 {
+enum ResamplingFunctionF64 {
     Average,
     Sum,
     Max,
@@ -45,51 +22,95 @@ enum ResamplingFunctionF32 {
 }
 
 #[pymethods]
-impl ResamplingFunctionF32 {
+impl ResamplingFunctionF64 {
     #[new]
     fn new(value: i32) -> PyResult<Self> {
         value.try_into()
     }
 
+    /// The members are known at build time, so the list is built once and
+    /// every call returns a shallow copy of the cached Python list; the
+    /// copy keeps callers that mutate the result from corrupting the cache.
     #[staticmethod]
-    fn values() -> Vec<i32> {
-        vec![
-            Self::Average.value(),
-            Self::Sum.value(),
-            Self::Max.value(),
-            Self::Min.value(),
-            Self::Last.value(),
-            Self::Count.value(),
-            Self::First.value(),
-            Self::Coalesce.value(),
-        ]
+    fn values(py: Python<'_>) -> Py<PyList> {
+        static VALUES: OnceLock<Py<PyList>> = OnceLock::new();
+        let cached = VALUES
+            .get_or_init(|| {
+                let values = vec![
+                    Self::Average.value(),
+                    Self::Sum.value(),
+                    Self::Max.value(),
+                    Self::Min.value(),
+                    Self::Last.value(),
+                    Self::Count.value(),
+                    Self::First.value(),
+                    Self::Coalesce.value(),
+                ];
+                PyList::new(py, values)
+                    .expect("building the values list cannot fail")
+                    .unbind()
+            })
+            .bind(py);
+        cached.get_slice(0, cached.len()).unbind()
     }
 
+    /// The members are known at build time, so the list is built once and
+    /// every call returns a shallow copy of the cached Python list; the
+    /// copy keeps callers that mutate the result from corrupting the cache.
     #[staticmethod]
-    fn members() -> Vec<(String, i32)> {
-        vec![
-            (Self::Average.to_string(), Self::Average.value()),
-            (Self::Sum.to_string(), Self::Sum.value()),
-            (Self::Max.to_string(), Self::Max.value()),
-            (Self::Min.to_string(), Self::Min.value()),
-            (Self::Last.to_string(), Self::Last.value()),
-            (Self::Count.to_string(), Self::Count.value()),
-            (Self::First.to_string(), Self::First.value()),
-            (Self::Coalesce.to_string(), Self::Coalesce.value()),
-        ]
+    fn members(py: Python<'_>) -> Py<PyList> {
+        static MEMBERS: OnceLock<Py<PyList>> = OnceLock::new();
+        let cached = MEMBERS
+            .get_or_init(|| {
+                let members = vec![
+                    (Self::Average.to_string(), Self::Average.value()),
+                    (Self::Sum.to_string(), Self::Sum.value()),
+                    (Self::Max.to_string(), Self::Max.value()),
+                    (Self::Min.to_string(), Self::Min.value()),
+                    (Self::Last.to_string(), Self::Last.value()),
+                    (Self::Count.to_string(), Self::Count.value()),
+                    (Self::First.to_string(), Self::First.value()),
+                    (Self::Coalesce.to_string(), Self::Coalesce.value()),
+                ];
+                PyList::new(py, members)
+                    .expect("building the members list cannot fail")
+                    .unbind()
+            })
+            .bind(py);
+        cached.get_slice(0, cached.len()).unbind()
     }
 
-    fn __str__(&self) -> String {
-        format!("{}.{}", "ResamplingFunction", self)
+    fn __str__<'py>(&self, py: Python<'py>) -> &Bound<'py, PyString> {
+        match self {
+            Self::Average => intern!(py, "ResamplingFunction.Average"),
+            Self::Sum => intern!(py, "ResamplingFunction.Sum"),
+            Self::Max => intern!(py, "ResamplingFunction.Max"),
+            Self::Min => intern!(py, "ResamplingFunction.Min"),
+            Self::Last => intern!(py, "ResamplingFunction.Last"),
+            Self::Count => intern!(py, "ResamplingFunction.Count"),
+            Self::First => intern!(py, "ResamplingFunction.First"),
+            Self::Coalesce => intern!(py, "ResamplingFunction.Coalesce"),
+        }
     }
 
     fn __repr__(&self) -> String {
-        format!("<{}: {}>", self.__str__(), self.value())
+        format!("<ResamplingFunction.{}: {}>", self, self.value())
     }
 
+    /// The member names are interned, so repeated lookups return the same
+    /// cached Python string.
     #[getter]
-    fn name(&self) -> String {
-        self.to_string()
+    fn name<'py>(&self, py: Python<'py>) -> &Bound<'py, PyString> {
+        match self {
+            Self::Average => intern!(py, "Average"),
+            Self::Sum => intern!(py, "Sum"),
+            Self::Max => intern!(py, "Max"),
+            Self::Min => intern!(py, "Min"),
+            Self::Last => intern!(py, "Last"),
+            Self::Count => intern!(py, "Count"),
+            Self::First => intern!(py, "First"),
+            Self::Coalesce => intern!(py, "Coalesce"),
+        }
     }
 
     #[getter]
@@ -107,7 +128,7 @@ impl ResamplingFunctionF32 {
     }
 }
 
-impl TryFrom<i32> for ResamplingFunctionF32 {
+impl TryFrom<i32> for ResamplingFunctionF64 {
     type Error = PyErr;
 
     fn try_from(value: i32) -> Result<Self, Self::Error> {
@@ -125,59 +146,63 @@ impl TryFrom<i32> for ResamplingFunctionF32 {
     }
 }
 
-impl Display for ResamplingFunctionF32 {
+impl Display for ResamplingFunctionF64 {
     fn fmt(&self, f: &mut std::fmt::Formatter<'_>) -> std::fmt::Result {
         write!(
             f,
             "{}",
             match self {
-                ResamplingFunctionF32::Average => "Average",
-                ResamplingFunctionF32::Sum => "Sum",
-                ResamplingFunctionF32::Max => "Max",
-                ResamplingFunctionF32::Min => "Min",
-                ResamplingFunctionF32::First => "First",
-                ResamplingFunctionF32::Last => "Last",
-                ResamplingFunctionF32::Coalesce => "Coalesce",
-                ResamplingFunctionF32::Count => "Count",
+                ResamplingFunctionF64::Average => "Average",
+                ResamplingFunctionF64::Sum => "Sum",
+                ResamplingFunctionF64::Max => "Max",
+                ResamplingFunctionF64::Min => "Min",
+                ResamplingFunctionF64::First => "First",
+                ResamplingFunctionF64::Last => "Last",
+                ResamplingFunctionF64::Coalesce => "Coalesce",
+                ResamplingFunctionF64::Count => "Count",
             }
         )
     }
 }
 
-impl From<ResamplingFunctionF32> for ResamplingFunction<f32, PythonSample> {
-    fn from(resampling_function: ResamplingFunctionF32) -> Self {
+impl From<ResamplingFunctionF64> for NumericResamplingFunction {
+    fn from(resampling_function: ResamplingFunctionF64) -> Self {
         match resampling_function {
-            ResamplingFunctionF32::Average => ResamplingFunction::Average,
-            ResamplingFunctionF32::Sum => ResamplingFunction::Sum,
-            ResamplingFunctionF32::Max => ResamplingFunction::Max,
-            ResamplingFunctionF32::Min => ResamplingFunction::Min,
-            ResamplingFunctionF32::First => ResamplingFunction::First,
-            ResamplingFunctionF32::Last => ResamplingFunction::Last,
-            ResamplingFunctionF32::Coalesce => ResamplingFunction::Coalesce,
-            ResamplingFunctionF32::Count => ResamplingFunction::Count,
+            ResamplingFunctionF64::Average => NumericResamplingFunction::Average,
+            ResamplingFunctionF64::Sum => NumericResamplingFunction::Sum,
+            ResamplingFunctionF64::Max => NumericResamplingFunction::Max,
+            ResamplingFunctionF64::Min => NumericResamplingFunction::Min,
+            ResamplingFunctionF64::First => NumericResamplingFunction::First,
+            ResamplingFunctionF64::Last => NumericResamplingFunction::Last,
+            ResamplingFunctionF64::Coalesce => NumericResamplingFunction::Coalesce,
+            ResamplingFunctionF64::Count => NumericResamplingFunction::Count,
         }
     }
 }
 
-/// The Resampler class for f32 values.
+/// The Resampler class for f64 values.
+///
+/// It wraps the [`NumericResampler`], which keeps the samples in flat
+/// structure-of-arrays buffers that the SIMD aggregation kernels consume
+/// directly; `None` values are encoded as NaN at this boundary.
 #[pyclass(name = "Resampler")]
-struct ResamplerF32 {
-    inner: Resampler<f32, PythonSample>,
+struct ResamplerF64 {
+    inner: NumericResampler,
 }
 
 #[pymethods]
-impl ResamplerF32 {
+impl ResamplerF64 {
     #[new]
     #[pyo3(signature = (interval, resampling_function, *, max_age_in_intervals, start, first_timestamp=true))]
     fn new(
         interval: TimeDelta,
-        resampling_function: ResamplingFunctionF32,
+        resampling_function: ResamplingFunctionF64,
         max_age_in_intervals: i32,
         start: DateTime<Utc>,
         first_timestamp: bool,
     ) -> Self {
         Self {
-            inner: Resampler::new(
+            inner: NumericResampler::new(
                 interval,
                 resampling_function.into(),
                 max_age_in_intervals,
@@ -188,25 +213,185 @@ impl ResamplerF32 {
     }
 
     #[pyo3(signature = (*, timestamp, value))]
-    fn push_sample(&mut self, timestamp: DateTime<Utc>, value: Option<f32>) {
-        self.inner.push(PythonSample::new(timestamp, value));
+    fn push_sample(&mut self, timestamp: DateTime<Utc>, value: Option<f64>) {
+        self.inner.push(timestamp, value);
+    }
+
+    /// Pushes a new sample with a nanosecond timestamp into the resampler
+    /// buffer; a NaN value encodes a missing (`None`) sample.
+    ///
+    /// This skips the `datetime` → `DateTime<Utc>` conversion of
+    /// `push_sample` entirely, and taking a plain `f64` instead of an
+    /// `Option<f64>` also skips the per-call `None` check at the boundary;
+    /// both values go straight into the buffer, which stores nanosecond
+    /// timestamps and NaN-encoded values internally anyway.
+    #[pyo3(signature = (*, timestamp_ns, value))]
+    fn push_sample_ns(&mut self, timestamp_ns: i64, value: f64) {
+        self.inner.push_nanoseconds(timestamp_ns, value);
+    }
+
+    /// Pushes a batch of samples into the resampler buffer in a single call.
+    ///
+    /// Takes an array of nanosecond UTC timestamps and an array of values of
+    /// the same length. NaN values are treated as missing (`None`) samples.
+    /// This avoids crossing the Python/Rust boundary once per sample, which
+    /// dominates the cost of pushing high-rate streams sample by sample.
+    #[pyo3(signature = (*, timestamps, values))]
+    fn push_samples(
+        &mut self,
+        py: Python<'_>,
+        timestamps: PyReadonlyArray1<'_, i64>,
+        values: PyReadonlyArray1<'_, f64>,
+    ) -> PyResult<()> {
+        let timestamps = timestamps.as_slice()?;
+        let values = values.as_slice()?;
+        if timestamps.len() != values.len() {
+            return Err(PyValueError::new_err(
+                "timestamps and values must have the same length",
+            ));
+        }
+        // Release the GIL while copying the batch into the buffer so other
+        // Python threads can run; the readonly borrows keep the arrays
+        // alive and unchanged for the duration.
+        py.allow_threads(|| {
+            for (&timestamp_ns, &value) in timestamps.iter().zip(values) {
+                self.inner.push_nanoseconds(timestamp_ns, value);
+            }
+        });
+        Ok(())
     }
 
     #[pyo3(signature = (end=None))]
-    fn resample(&mut self, end: Option<DateTime<Utc>>) -> Vec<(DateTime<Utc>, Option<f32>)> {
-        match end {
+    fn resample(
+        &mut self,
+        py: Python<'_>,
+        end: Option<DateTime<Utc>>,
+    ) -> Vec<(DateTime<Utc>, Option<f64>)> {
+        // Release the GIL for the resampling itself, which runs entirely on
+        // Rust data; it is only reacquired to build the result list.
+        py.allow_threads(|| match end {
             Some(end) => self.inner.resample(end),
             None => self.inner.resample_now(),
+        })
+    }
+
+    /// Resamples the samples in the buffer until the given end time,
+    /// returning NumPy arrays instead of a list of tuples.
+    ///
+    /// The timestamp and value vectors built on the Rust side become the
+    /// backing storage of the returned arrays without being copied, so no
+    /// per-bucket `datetime` or `float` Python objects are allocated.
+    #[pyo3(signature = (end=None))]
+    fn resample_arrays<'py>(
+        &mut self,
+        py: Python<'py>,
+        end: Option<DateTime<Utc>>,
+    ) -> (Bound<'py, PyArray1<i64>>, Bound<'py, PyArray1<f64>>) {
+        let end_ns = datetime_to_nanoseconds(end.unwrap_or_else(Utc::now));
+        // Release the GIL for the resampling itself, which runs entirely on
+        // Rust data; it is only reacquired to wrap the result arrays.
+        let (timestamps, values) = py.allow_threads(|| self.inner.resample_nanoseconds(end_ns));
+        (timestamps.into_pyarray(py), values.into_pyarray(py))
+    }
+}
+
+/// The resampled samples of every keyed stream, keyed by owned strings so
+/// the result can be converted into a Python dict.
+type ResampledGroupsByName = HashMap<String, Vec<(DateTime<Utc>, Option<f64>)>>;
+
+/// The GroupedResampler class for f64 values keyed by strings.
+///
+/// It manages one [`NumericResampler`] per key on the Rust side, so keyed
+/// streams can be pushed and resampled through a single object instead of a
+/// Python-level dict of resamplers with one boundary crossing per stream.
+#[pyclass(name = "GroupedResampler")]
+struct GroupedResamplerF64 {
+    inner: GroupedResampler<String>,
+}
+
+#[pymethods]
+impl GroupedResamplerF64 {
+    #[new]
+    #[pyo3(signature = (interval, resampling_function, *, max_age_in_intervals, start, first_timestamp=true))]
+    fn new(
+        interval: TimeDelta,
+        resampling_function: ResamplingFunctionF64,
+        max_age_in_intervals: i32,
+        start: DateTime<Utc>,
+        first_timestamp: bool,
+    ) -> Self {
+        Self {
+            inner: GroupedResampler::new(
+                interval,
+                resampling_function.into(),
+                max_age_in_intervals,
+                start,
+                first_timestamp,
+            ),
+        }
+    }
+
+    #[pyo3(signature = (*, key, timestamp, value))]
+    fn push_sample(&mut self, key: String, timestamp: DateTime<Utc>, value: Option<f64>) {
+        self.inner.push(key, timestamp, value);
+    }
+
+    /// Pushes a batch of keyed samples into the resampler in a single call.
+    ///
+    /// Takes a list of keys, an array of nanosecond UTC timestamps and an
+    /// array of values, all of the same length. NaN values are treated as
+    /// missing (`None`) samples. The per-key streams are created and filled
+    /// entirely on the Rust side, so the Python/Rust boundary is crossed
+    /// once for the whole batch instead of once per sample and stream.
+    #[pyo3(signature = (*, keys, timestamps, values))]
+    fn push_samples(
+        &mut self,
+        py: Python<'_>,
+        keys: Vec<String>,
+        timestamps: PyReadonlyArray1<'_, i64>,
+        values: PyReadonlyArray1<'_, f64>,
+    ) -> PyResult<()> {
+        let timestamps = timestamps.as_slice()?;
+        let values = values.as_slice()?;
+        if keys.len() != timestamps.len() || timestamps.len() != values.len() {
+            return Err(PyValueError::new_err(
+                "keys, timestamps and values must have the same length",
+            ));
         }
-        .into_iter()
-        .map(PythonSample::to_tuple)
-        .collect()
+        // Release the GIL while distributing the batch over the per-key
+        // buffers; the readonly borrows keep the arrays alive and unchanged
+        // for the duration.
+        py.allow_threads(|| {
+            for ((key, &timestamp_ns), &value) in keys.into_iter().zip(timestamps).zip(values) {
+                self.inner.push_nanoseconds(key, timestamp_ns, value);
+            }
+        });
+        Ok(())
+    }
+
+    /// Resamples all keyed streams and returns a dict mapping each key to
+    /// its list of resampled samples.
+    #[pyo3(signature = (end=None))]
+    fn resample(&mut self, py: Python<'_>, end: Option<DateTime<Utc>>) -> ResampledGroupsByName {
+        // Release the GIL for the resampling itself, which runs entirely on
+        // Rust data; it is only reacquired to build the result dict.
+        py.allow_threads(|| {
+            let resampled = match end {
+                Some(end) => self.inner.resample(end),
+                None => self.inner.resample_now(),
+            };
+            resampled
+                .into_iter()
+                .map(|(key, samples)| (key.clone(), samples))
+                .collect()
+        })
     }
 }
 
 #[pymodule]
 fn _rust_backend(m: &Bound<'_, PyModule>) -> PyResult<()> {
-    m.add_class::<ResamplerF32>()?;
-    m.add_class::<ResamplingFunctionF32>()?;
+    m.add_class::<GroupedResamplerF64>()?;
+    m.add_class::<ResamplerF64>()?;
+    m.add_class::<ResamplingFunctionF64>()?;
     Ok(())
 }
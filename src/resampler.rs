@@ -7,13 +7,22 @@
 use chrono::{DateTime, TimeDelta, Utc};
 use log::warn;
 use num_traits::FromPrimitive;
+use std::collections::VecDeque;
 use std::fmt::Debug;
 use std::ops::Div;
 
 use itertools::Itertools;
 
+use crate::window::{SlidingWindow, TwoStacks, WindowSegmentTree};
+
 pub type CustomResamplingFunction<S, T> = Box<dyn FnMut(&[&S]) -> Option<T> + Send + Sync>;
 
+/// The window length (in intervals) from which the non-invertible resampling
+/// functions (Max/Min) switch from rescanning the window for every emitted
+/// interval to an incrementally maintained segment-tree window. For small
+/// windows the rescan is cheaper than the tree bookkeeping.
+const SEGMENT_TREE_MIN_WINDOW: i32 = 32;
+
 /// The Sample trait represents a single sample in a time series.
 pub trait Sample: Clone + Debug + Default {
     type Value;
@@ -59,15 +68,42 @@ pub enum ResamplingFunction<
 }
 
 impl<
-        T: Div<Output = T> + std::iter::Sum + PartialOrd + FromPrimitive + Default + Debug,
+        T: Div<Output = T> + std::iter::Sum + PartialOrd + FromPrimitive + Default + Clone + Debug,
         S: Sample<Value = T>,
     > ResamplingFunction<T, S>
 {
+    /// Returns an incrementally maintained sliding window for this resampling
+    /// function, or `None` if the function has to be applied to the buffered
+    /// samples of each interval directly.
+    fn sliding_window(&self, max_age_in_intervals: i32) -> Option<SlidingWindow<T>> {
+        let capacity = max_age_in_intervals.max(0) as usize;
+        match self {
+            Self::Max if max_age_in_intervals >= SEGMENT_TREE_MIN_WINDOW => Some(
+                SlidingWindow::Max(WindowSegmentTree::with_capacity(capacity)),
+            ),
+            Self::Min if max_age_in_intervals >= SEGMENT_TREE_MIN_WINDOW => Some(
+                SlidingWindow::Min(WindowSegmentTree::with_capacity(capacity)),
+            ),
+            Self::Sum => Some(SlidingWindow::Sum(TwoStacks::new())),
+            Self::Average => Some(SlidingWindow::Average(TwoStacks::new())),
+            Self::Count => Some(SlidingWindow::Count(TwoStacks::new())),
+            _ => None,
+        }
+    }
+
     pub fn apply(&mut self, samples: &[&S]) -> Option<T> {
         match self {
-            Self::Average => Self::Sum
-                .apply(samples)
-                .and_then(|sum| Self::Count.apply(samples).map(|count| sum.div(count))),
+            Self::Average => {
+                // Sum and count in a single fused sweep instead of scanning
+                // the samples once per aggregate.
+                let mut count = 0_usize;
+                samples
+                    .iter()
+                    .filter_map(|s| s.value())
+                    .inspect(|_| count += 1)
+                    .sum1::<T>()
+                    .map(|sum| sum.div(T::from_usize(count).unwrap_or_else(|| T::default())))
+            }
             Self::Sum => samples.iter().filter_map(|s| s.value()).sum1(),
             Self::Max => samples.iter().filter_map(|s| s.value()).max_by(|a, b| {
                 a.partial_cmp(b).unwrap_or_else(|| {
@@ -152,10 +188,14 @@ pub struct Resampler<
     /// timestamp of the last sample in the buffer and the aggregation will
     /// be done with the samples that are `interval` in the past.
     first_timestamp: bool,
+    /// Scratch storage for the timestamps of the samples in the sliding
+    /// window, kept across `resample` calls so its allocation is reused
+    /// (cleared, not freed) instead of reallocated on every call.
+    window_timestamps: VecDeque<DateTime<Utc>>,
 }
 
 impl<
-        T: Div<Output = T> + std::iter::Sum + PartialOrd + FromPrimitive + Default + Debug,
+        T: Div<Output = T> + std::iter::Sum + PartialOrd + FromPrimitive + Default + Clone + Debug,
         S: Sample<Value = T>,
     > Resampler<T, S>
 {
@@ -196,8 +236,18 @@ impl<
             warn!("start time is greater or equal to end time");
             return vec![];
         }
-        let mut res = vec![];
-        let mut interval_buffer = vec![];
+        // The number of emitted samples and the maximum size of the
+        // interval_buffer are known upfront, so both vectors are sized in a
+        // single allocation instead of growing while resampling.
+        let mut res = Vec::with_capacity(interval_count(self.start, end, self.interval));
+        let mut interval_buffer = Vec::with_capacity(self.buffer.len());
+        // An incrementally maintained window (with the timestamps of the
+        // samples it contains) replaces the interval_buffer for the
+        // resampling functions that support it.
+        let mut window = self
+            .resampling_function
+            .sliding_window(self.max_age_in_intervals);
+        self.window_timestamps.clear();
         let mut buffer_iter = self.buffer.iter();
         let mut next_sample: Option<&S> = buffer_iter.next();
         self.input_start = next_sample.map(|s| s.timestamp());
@@ -207,58 +257,76 @@ impl<
             self.interval
         };
 
+        // The maximum age of a sample; it only changes when the input
+        // interval is adapted to the first consumed sample, so it is kept as
+        // a running value instead of being multiplied out for every interval.
+        let mut max_age = self.input_interval.unwrap_or(self.interval) * self.max_age_in_intervals;
+
         // loop over the intervals
         while self.start < end {
+            let edge_timestamp = self.start + self.interval;
             // loop over the samples in the buffer
             while next_sample
                 .map(|s| {
-                    is_left_of_buffer_edge(
-                        self.first_timestamp,
-                        &s.timestamp(),
-                        &(self.start + self.interval),
-                    )
+                    is_left_of_buffer_edge(self.first_timestamp, &s.timestamp(), &edge_timestamp)
                 })
                 .unwrap_or(false)
             {
                 // next sample is not newer than the current interval
                 if let Some(s) = next_sample {
-                    // add the sample to the interval_buffer
-                    interval_buffer.push(s);
+                    // add the sample to the window or the interval_buffer
+                    if let Some(window) = window.as_mut() {
+                        window.push(s.value());
+                        self.window_timestamps.push_back(s.timestamp());
+                    } else {
+                        interval_buffer.push(s);
+                    }
                     // get the next sample
                     next_sample = buffer_iter.next();
                     // update the input_start and input_interval to adapt
                     // the resampling interval to the input data
                     if let Some(input_start) = self.input_start {
                         if self.input_interval.is_none() {
-                            self.input_interval =
-                                Some((s.timestamp() - input_start).max(self.interval));
+                            let input_interval = (s.timestamp() - input_start).max(self.interval);
+                            self.input_interval = Some(input_interval);
+                            max_age = input_interval * self.max_age_in_intervals;
                         }
                     }
                 }
             }
 
-            // Remove samples from interval_buffer that are older than
-            // max_age
-            let input_interval = self.input_interval.unwrap_or(self.interval);
-            let drain_end_date =
-                self.start + self.interval - input_interval * self.max_age_in_intervals;
-            interval_buffer.retain(|s| {
-                is_right_of_buffer_edge(self.first_timestamp, &s.timestamp(), &drain_end_date)
-            });
+            // Remove samples from the window or interval_buffer that are
+            // older than max_age
+            let drain_end_date = edge_timestamp - max_age;
+            let value = if let Some(window) = window.as_mut() {
+                while self
+                    .window_timestamps
+                    .front()
+                    .map(|timestamp| {
+                        !is_right_of_buffer_edge(self.first_timestamp, timestamp, &drain_end_date)
+                    })
+                    .unwrap_or(false)
+                {
+                    self.window_timestamps.pop_front();
+                    window.evict();
+                }
+                window.query()
+            } else {
+                interval_buffer.retain(|s| {
+                    is_right_of_buffer_edge(self.first_timestamp, &s.timestamp(), &drain_end_date)
+                });
+                self.resampling_function.apply(interval_buffer.as_slice())
+            };
 
-            // resample the interval_buffer
-            res.push(Sample::new(
-                self.start + offset,
-                self.resampling_function.apply(interval_buffer.as_slice()),
-            ));
+            // resample the current interval
+            res.push(Sample::new(self.start + offset, value));
 
             // Go to the next interval
-            self.start += self.interval;
+            self.start = edge_timestamp;
         }
 
         // Remove samples from buffer that are older than max_age
-        let interval = self.input_interval.unwrap_or(self.interval);
-        let drain_end_date = end - interval * self.max_age_in_intervals;
+        let drain_end_date = end - max_age;
         self.buffer.retain(|s| {
             is_right_of_buffer_edge(self.first_timestamp, &s.timestamp(), &drain_end_date)
         });
@@ -283,6 +351,20 @@ impl<
     }
 }
 
+/// Returns the number of resampling intervals between start and end, i.e.
+/// the number of samples a resample call over that range emits.
+pub(crate) fn interval_count(
+    start: DateTime<Utc>,
+    end: DateTime<Utc>,
+    interval: TimeDelta,
+) -> usize {
+    (end - start)
+        .num_nanoseconds()
+        .zip(interval.num_nanoseconds().filter(|&interval| interval > 0))
+        .map(|(span, interval)| ((span + interval - 1) / interval).max(0) as usize)
+        .unwrap_or(0)
+}
+
 /// Aligns a timestamp to the epoch of the resampling interval.
 pub(crate) fn epoch_align(
     interval: TimeDelta,
@@ -297,10 +379,10 @@ pub(crate) fn epoch_align(
     .unwrap_or(timestamp)
 }
 
-fn is_left_of_buffer_edge(
+pub(crate) fn is_left_of_buffer_edge<T: PartialOrd>(
     first_timestamp: bool,
-    timestamp: &DateTime<Utc>,
-    edge_timestamp: &DateTime<Utc>,
+    timestamp: &T,
+    edge_timestamp: &T,
 ) -> bool {
     if first_timestamp {
         timestamp < edge_timestamp
@@ -309,10 +391,10 @@ fn is_left_of_buffer_edge(
     }
 }
 
-fn is_right_of_buffer_edge(
+pub(crate) fn is_right_of_buffer_edge<T: PartialOrd>(
     first_timestamp: bool,
-    timestamp: &DateTime<Utc>,
-    edge_timestamp: &DateTime<Utc>,
+    timestamp: &T,
+    edge_timestamp: &T,
 ) -> bool {
     if first_timestamp {
         timestamp >= edge_timestamp
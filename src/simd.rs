@@ -0,0 +1,640 @@
+// License: MIT
+// Copyright © 2024 Frequenz Energy-as-a-Service GmbH
+
+//! SIMD-accelerated aggregation kernels over contiguous `f64` slices.
+//!
+//! The kernels skip NaN values, which is how missing (`None`) samples are
+//! encoded in the flat buffers these kernels are meant for, and return `None`
+//! if a slice contains no valid value at all.
+//!
+//! On x86-64 the kernels dispatch at runtime to an AVX-512 variant (8 lanes
+//! per iteration) or an AVX2 variant (4 lanes per iteration, unrolled over 4
+//! accumulators), falling back to scalar loops elsewhere. Aggregating a
+//! bucket of samples is a pure horizontal reduction, so this turns the
+//! per-bucket cost from one dependent operation per sample into one per SIMD
+//! lane.
+
+/// Returns the sum of all non-NaN values, or `None` if there is none.
+pub fn sum(values: &[f64]) -> Option<f64> {
+    #[cfg(target_arch = "x86_64")]
+    {
+        if std::arch::is_x86_feature_detected!("avx512f") {
+            // SAFETY: only called when AVX-512F is available.
+            return unsafe { sum_avx512(values) };
+        }
+        if std::arch::is_x86_feature_detected!("avx2") {
+            // SAFETY: only called when AVX2 is available.
+            return unsafe { sum_avx2(values) };
+        }
+    }
+    sum_scalar(values)
+}
+
+/// Returns the minimum of all non-NaN values, or `None` if there is none.
+pub fn min(values: &[f64]) -> Option<f64> {
+    #[cfg(target_arch = "x86_64")]
+    {
+        if std::arch::is_x86_feature_detected!("avx512f") {
+            // SAFETY: only called when AVX-512F is available.
+            return unsafe { min_avx512(values) };
+        }
+        if std::arch::is_x86_feature_detected!("avx2") {
+            // SAFETY: only called when AVX2 is available.
+            return unsafe { min_avx2(values) };
+        }
+    }
+    min_scalar(values)
+}
+
+/// Returns the maximum of all non-NaN values, or `None` if there is none.
+pub fn max(values: &[f64]) -> Option<f64> {
+    #[cfg(target_arch = "x86_64")]
+    {
+        if std::arch::is_x86_feature_detected!("avx512f") {
+            // SAFETY: only called when AVX-512F is available.
+            return unsafe { max_avx512(values) };
+        }
+        if std::arch::is_x86_feature_detected!("avx2") {
+            // SAFETY: only called when AVX2 is available.
+            return unsafe { max_avx2(values) };
+        }
+    }
+    max_scalar(values)
+}
+
+/// Returns the number of non-NaN values.
+///
+/// Unlike the other kernels this never touches the values as floats: each
+/// lane only contributes one bit of the validity compare mask, which is
+/// reduced with a population count, so counting a chunk of lanes is a
+/// compare, a movemask and a popcnt.
+pub fn count(values: &[f64]) -> usize {
+    #[cfg(target_arch = "x86_64")]
+    {
+        if std::arch::is_x86_feature_detected!("avx512f") {
+            // SAFETY: only called when AVX-512F is available.
+            return unsafe { count_avx512(values) };
+        }
+        if std::arch::is_x86_feature_detected!("avx2") {
+            // SAFETY: only called when AVX2 is available.
+            return unsafe { count_avx2(values) };
+        }
+    }
+    count_scalar(values)
+}
+
+/// The sum, count, minimum and maximum of the non-NaN values of a slice,
+/// computed in a single fused sweep.
+///
+/// Emitting one output bucket often needs several of these aggregates at
+/// once (Average needs sum and count, diagnostics want min/max), and the
+/// aggregation is memory-bound, so computing them in one pass over the data
+/// costs barely more than computing one of them.
+#[derive(Clone, Copy, Debug, Default, PartialEq)]
+pub struct Stats {
+    count: usize,
+    sum: f64,
+    min: f64,
+    max: f64,
+}
+
+impl Stats {
+    /// Creates the aggregates of a single value, NaN counting as missing.
+    pub fn lift(value: f64) -> Self {
+        if value.is_nan() {
+            Self::default()
+        } else {
+            Self {
+                count: 1,
+                sum: value,
+                min: value,
+                max: value,
+            }
+        }
+    }
+
+    /// Merges the aggregates of two adjacent runs of values.
+    pub fn merge(a: Self, b: Self) -> Self {
+        match (a.count, b.count) {
+            (_, 0) => a,
+            (0, _) => b,
+            _ => Self {
+                count: a.count + b.count,
+                sum: a.sum + b.sum,
+                min: a.min.min(b.min),
+                max: a.max.max(b.max),
+            },
+        }
+    }
+
+    /// Returns the number of non-NaN values.
+    pub fn count(&self) -> usize {
+        self.count
+    }
+
+    /// Returns the sum of the non-NaN values, or `None` if there is none.
+    pub fn sum(&self) -> Option<f64> {
+        (self.count > 0).then_some(self.sum)
+    }
+
+    /// Returns the minimum of the non-NaN values, or `None` if there is none.
+    pub fn min(&self) -> Option<f64> {
+        (self.count > 0).then_some(self.min)
+    }
+
+    /// Returns the maximum of the non-NaN values, or `None` if there is none.
+    pub fn max(&self) -> Option<f64> {
+        (self.count > 0).then_some(self.max)
+    }
+
+    /// Returns the average of the non-NaN values, or `None` if there is none.
+    pub fn average(&self) -> Option<f64> {
+        (self.count > 0).then_some(self.sum / self.count as f64)
+    }
+}
+
+/// Returns the fused [`Stats`] aggregates of all non-NaN values.
+pub fn stats(values: &[f64]) -> Stats {
+    #[cfg(target_arch = "x86_64")]
+    {
+        if std::arch::is_x86_feature_detected!("avx512f") {
+            // SAFETY: only called when AVX-512F is available.
+            return unsafe { stats_avx512(values) };
+        }
+        if std::arch::is_x86_feature_detected!("avx2") {
+            // SAFETY: only called when AVX2 is available.
+            return unsafe { stats_avx2(values) };
+        }
+    }
+    stats_scalar(values)
+}
+
+/// Returns the index of the first minimum of all non-NaN values, or `None`
+/// if there is none.
+pub fn argmin(values: &[f64]) -> Option<usize> {
+    #[cfg(target_arch = "x86_64")]
+    if std::arch::is_x86_feature_detected!("avx2") {
+        // SAFETY: only called when AVX2 is available.
+        return unsafe { argminmax_avx2::<false>(values) };
+    }
+    argmin_scalar(values)
+}
+
+/// Returns the index of the first maximum of all non-NaN values, or `None`
+/// if there is none.
+pub fn argmax(values: &[f64]) -> Option<usize> {
+    #[cfg(target_arch = "x86_64")]
+    if std::arch::is_x86_feature_detected!("avx2") {
+        // SAFETY: only called when AVX2 is available.
+        return unsafe { argminmax_avx2::<true>(values) };
+    }
+    argmax_scalar(values)
+}
+
+fn sum_scalar(values: &[f64]) -> Option<f64> {
+    let mut sum = 0.0;
+    let mut valid = 0_usize;
+    for &value in values {
+        if !value.is_nan() {
+            sum += value;
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(sum)
+}
+
+fn min_scalar(values: &[f64]) -> Option<f64> {
+    let mut min = f64::INFINITY;
+    let mut valid = 0_usize;
+    for &value in values {
+        if !value.is_nan() {
+            min = min.min(value);
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(min)
+}
+
+fn max_scalar(values: &[f64]) -> Option<f64> {
+    let mut max = f64::NEG_INFINITY;
+    let mut valid = 0_usize;
+    for &value in values {
+        if !value.is_nan() {
+            max = max.max(value);
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(max)
+}
+
+fn count_scalar(values: &[f64]) -> usize {
+    values.iter().filter(|value| !value.is_nan()).count()
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn count_avx2(values: &[f64]) -> usize {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 4;
+    // Four independent compare/popcnt streams per iteration.
+    const UNROLL: usize = 4;
+
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES * UNROLL);
+    for chunk in &mut chunks {
+        for i in 0..UNROLL {
+            let v = _mm256_loadu_pd(chunk.as_ptr().add(i * LANES));
+            let mask = _mm256_cmp_pd::<_CMP_EQ_OQ>(v, v);
+            valid += _mm256_movemask_pd(mask).count_ones();
+        }
+    }
+    valid as usize + count_scalar(chunks.remainder())
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f")]
+unsafe fn count_avx512(values: &[f64]) -> usize {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 8;
+
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm512_loadu_pd(chunk.as_ptr());
+        valid += _mm512_cmp_pd_mask::<_CMP_EQ_OQ>(v, v).count_ones();
+    }
+    valid as usize + count_scalar(chunks.remainder())
+}
+
+fn stats_scalar(values: &[f64]) -> Stats {
+    let mut stats = Stats::default();
+    for &value in values {
+        stats = Stats::merge(stats, Stats::lift(value));
+    }
+    stats
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn stats_avx2(values: &[f64]) -> Stats {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 4;
+
+    let mut sums = _mm256_setzero_pd();
+    let mut mins = _mm256_set1_pd(f64::INFINITY);
+    let mut maxs = _mm256_set1_pd(f64::NEG_INFINITY);
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm256_loadu_pd(chunk.as_ptr());
+        let mask = _mm256_cmp_pd::<_CMP_EQ_OQ>(v, v);
+        sums = _mm256_add_pd(sums, _mm256_and_pd(v, mask));
+        mins = _mm256_min_pd(
+            mins,
+            _mm256_blendv_pd(_mm256_set1_pd(f64::INFINITY), v, mask),
+        );
+        maxs = _mm256_max_pd(
+            maxs,
+            _mm256_blendv_pd(_mm256_set1_pd(f64::NEG_INFINITY), v, mask),
+        );
+        valid += _mm256_movemask_pd(mask).count_ones();
+    }
+
+    let mut sum_lanes = [0.0; LANES];
+    let mut min_lanes = [0.0; LANES];
+    let mut max_lanes = [0.0; LANES];
+    _mm256_storeu_pd(sum_lanes.as_mut_ptr(), sums);
+    _mm256_storeu_pd(min_lanes.as_mut_ptr(), mins);
+    _mm256_storeu_pd(max_lanes.as_mut_ptr(), maxs);
+    let mut stats = Stats {
+        count: valid as usize,
+        sum: sum_lanes.iter().sum(),
+        min: min_lanes.iter().fold(f64::INFINITY, |a, &b| a.min(b)),
+        max: max_lanes.iter().fold(f64::NEG_INFINITY, |a, &b| a.max(b)),
+    };
+
+    for &value in chunks.remainder() {
+        stats = Stats::merge(stats, Stats::lift(value));
+    }
+    stats
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f")]
+unsafe fn stats_avx512(values: &[f64]) -> Stats {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 8;
+
+    let mut sums = _mm512_setzero_pd();
+    let mut mins = _mm512_set1_pd(f64::INFINITY);
+    let mut maxs = _mm512_set1_pd(f64::NEG_INFINITY);
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm512_loadu_pd(chunk.as_ptr());
+        let mask = _mm512_cmp_pd_mask::<_CMP_EQ_OQ>(v, v);
+        sums = _mm512_mask_add_pd(sums, mask, sums, v);
+        mins = _mm512_mask_min_pd(mins, mask, mins, v);
+        maxs = _mm512_mask_max_pd(maxs, mask, maxs, v);
+        valid += mask.count_ones();
+    }
+    let mut stats = Stats {
+        count: valid as usize,
+        sum: _mm512_reduce_add_pd(sums),
+        min: _mm512_reduce_min_pd(mins),
+        max: _mm512_reduce_max_pd(maxs),
+    };
+
+    for &value in chunks.remainder() {
+        stats = Stats::merge(stats, Stats::lift(value));
+    }
+    stats
+}
+
+fn argmin_scalar(values: &[f64]) -> Option<usize> {
+    let mut best: Option<(f64, usize)> = None;
+    for (index, &value) in values.iter().enumerate() {
+        if !value.is_nan() && best.is_none_or(|(best_value, _)| value < best_value) {
+            best = Some((value, index));
+        }
+    }
+    best.map(|(_, index)| index)
+}
+
+fn argmax_scalar(values: &[f64]) -> Option<usize> {
+    let mut best: Option<(f64, usize)> = None;
+    for (index, &value) in values.iter().enumerate() {
+        if !value.is_nan() && best.is_none_or(|(best_value, _)| value > best_value) {
+            best = Some((value, index));
+        }
+    }
+    best.map(|(_, index)| index)
+}
+
+/// The shared AVX2 argmin/argmax kernel; `MAX` selects the direction.
+///
+/// A vector of candidate indices is maintained next to the vector of
+/// candidate values and both are updated through the same blend mask, so the
+/// loop carries no branches: a lane adopts a new (value, index) pair exactly
+/// when the new value is valid and strictly better (or the lane has not seen
+/// a valid value yet, tracked by the lane still being NaN).
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn argminmax_avx2<const MAX: bool>(values: &[f64]) -> Option<usize> {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 4;
+
+    let mut best_values = _mm256_set1_pd(f64::NAN);
+    let mut best_indices = _mm256_setzero_si256();
+    let mut indices = _mm256_setr_epi64x(0, 1, 2, 3);
+    let step = _mm256_set1_epi64x(LANES as i64);
+
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm256_loadu_pd(chunk.as_ptr());
+        let valid = _mm256_cmp_pd::<_CMP_EQ_OQ>(v, v);
+        let better = if MAX {
+            _mm256_cmp_pd::<_CMP_GT_OQ>(v, best_values)
+        } else {
+            _mm256_cmp_pd::<_CMP_LT_OQ>(v, best_values)
+        };
+        // A lane that still holds NaN has not seen any valid value yet, so
+        // any valid value wins it.
+        let unseen = _mm256_cmp_pd::<_CMP_UNORD_Q>(best_values, best_values);
+        let update = _mm256_and_pd(valid, _mm256_or_pd(better, unseen));
+        best_values = _mm256_blendv_pd(best_values, v, update);
+        best_indices = _mm256_blendv_epi8(best_indices, indices, _mm256_castpd_si256(update));
+        indices = _mm256_add_epi64(indices, step);
+    }
+
+    let mut lane_values = [0.0; LANES];
+    let mut lane_indices = [0_i64; LANES];
+    _mm256_storeu_pd(lane_values.as_mut_ptr(), best_values);
+    _mm256_storeu_si256(lane_indices.as_mut_ptr() as *mut __m256i, best_indices);
+
+    // Horizontal reduction: each lane holds the first occurrence of its own
+    // best, so ties between lanes go to the lower index, which keeps the
+    // overall first occurrence.
+    let mut best: Option<(f64, usize)> = None;
+    for (&value, index) in lane_values.iter().zip(lane_indices) {
+        let index = index as usize;
+        let better = !value.is_nan()
+            && best.is_none_or(|(best_value, best_index)| {
+                let strictly_better = if MAX {
+                    value > best_value
+                } else {
+                    value < best_value
+                };
+                strictly_better || (value == best_value && index < best_index)
+            });
+        if better {
+            best = Some((value, index));
+        }
+    }
+
+    let offset = values.len() - chunks.remainder().len();
+    for (index, &value) in chunks.remainder().iter().enumerate() {
+        let better = !value.is_nan()
+            && best.is_none_or(|(best_value, _)| {
+                if MAX {
+                    value > best_value
+                } else {
+                    value < best_value
+                }
+            });
+        if better {
+            best = Some((value, offset + index));
+        }
+    }
+    best.map(|(_, index)| index)
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn sum_avx2(values: &[f64]) -> Option<f64> {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 4;
+    // Four independent accumulators hide the latency of the dependent adds.
+    const UNROLL: usize = 4;
+
+    let mut accumulators = [_mm256_setzero_pd(); UNROLL];
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES * UNROLL);
+    for chunk in &mut chunks {
+        for (i, accumulator) in accumulators.iter_mut().enumerate() {
+            let v = _mm256_loadu_pd(chunk.as_ptr().add(i * LANES));
+            // All-ones for non-NaN lanes, all-zeros for NaN lanes.
+            let mask = _mm256_cmp_pd::<_CMP_EQ_OQ>(v, v);
+            *accumulator = _mm256_add_pd(*accumulator, _mm256_and_pd(v, mask));
+            valid += _mm256_movemask_pd(mask).count_ones();
+        }
+    }
+
+    let accumulator = _mm256_add_pd(
+        _mm256_add_pd(accumulators[0], accumulators[1]),
+        _mm256_add_pd(accumulators[2], accumulators[3]),
+    );
+    let mut lanes = [0.0; LANES];
+    _mm256_storeu_pd(lanes.as_mut_ptr(), accumulator);
+    let mut sum = lanes.iter().sum::<f64>();
+
+    for &value in chunks.remainder() {
+        if !value.is_nan() {
+            sum += value;
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(sum)
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn min_avx2(values: &[f64]) -> Option<f64> {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 4;
+
+    let mut best = _mm256_set1_pd(f64::INFINITY);
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm256_loadu_pd(chunk.as_ptr());
+        let mask = _mm256_cmp_pd::<_CMP_EQ_OQ>(v, v);
+        // NaN lanes are replaced with the identity so they cannot win.
+        let candidate = _mm256_blendv_pd(_mm256_set1_pd(f64::INFINITY), v, mask);
+        best = _mm256_min_pd(best, candidate);
+        valid += _mm256_movemask_pd(mask).count_ones();
+    }
+
+    let mut lanes = [0.0; LANES];
+    _mm256_storeu_pd(lanes.as_mut_ptr(), best);
+    let mut min = lanes.iter().fold(f64::INFINITY, |a, &b| a.min(b));
+
+    for &value in chunks.remainder() {
+        if !value.is_nan() {
+            min = min.min(value);
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(min)
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx2")]
+unsafe fn max_avx2(values: &[f64]) -> Option<f64> {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 4;
+
+    let mut best = _mm256_set1_pd(f64::NEG_INFINITY);
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm256_loadu_pd(chunk.as_ptr());
+        let mask = _mm256_cmp_pd::<_CMP_EQ_OQ>(v, v);
+        // NaN lanes are replaced with the identity so they cannot win.
+        let candidate = _mm256_blendv_pd(_mm256_set1_pd(f64::NEG_INFINITY), v, mask);
+        best = _mm256_max_pd(best, candidate);
+        valid += _mm256_movemask_pd(mask).count_ones();
+    }
+
+    let mut lanes = [0.0; LANES];
+    _mm256_storeu_pd(lanes.as_mut_ptr(), best);
+    let mut max = lanes.iter().fold(f64::NEG_INFINITY, |a, &b| a.max(b));
+
+    for &value in chunks.remainder() {
+        if !value.is_nan() {
+            max = max.max(value);
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(max)
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f")]
+unsafe fn sum_avx512(values: &[f64]) -> Option<f64> {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 8;
+
+    let mut accumulator = _mm512_setzero_pd();
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm512_loadu_pd(chunk.as_ptr());
+        let mask = _mm512_cmp_pd_mask::<_CMP_EQ_OQ>(v, v);
+        // The masked add leaves NaN lanes of the accumulator untouched.
+        accumulator = _mm512_mask_add_pd(accumulator, mask, accumulator, v);
+        valid += mask.count_ones();
+    }
+    let mut sum = _mm512_reduce_add_pd(accumulator);
+
+    for &value in chunks.remainder() {
+        if !value.is_nan() {
+            sum += value;
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(sum)
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f")]
+unsafe fn min_avx512(values: &[f64]) -> Option<f64> {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 8;
+
+    let mut best = _mm512_set1_pd(f64::INFINITY);
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm512_loadu_pd(chunk.as_ptr());
+        let mask = _mm512_cmp_pd_mask::<_CMP_EQ_OQ>(v, v);
+        best = _mm512_mask_min_pd(best, mask, best, v);
+        valid += mask.count_ones();
+    }
+    let mut min = _mm512_reduce_min_pd(best);
+
+    for &value in chunks.remainder() {
+        if !value.is_nan() {
+            min = min.min(value);
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(min)
+}
+
+#[cfg(target_arch = "x86_64")]
+#[target_feature(enable = "avx512f")]
+unsafe fn max_avx512(values: &[f64]) -> Option<f64> {
+    use std::arch::x86_64::*;
+
+    const LANES: usize = 8;
+
+    let mut best = _mm512_set1_pd(f64::NEG_INFINITY);
+    let mut valid = 0_u32;
+    let mut chunks = values.chunks_exact(LANES);
+    for chunk in &mut chunks {
+        let v = _mm512_loadu_pd(chunk.as_ptr());
+        let mask = _mm512_cmp_pd_mask::<_CMP_EQ_OQ>(v, v);
+        best = _mm512_mask_max_pd(best, mask, best, v);
+        valid += mask.count_ones();
+    }
+    let mut max = _mm512_reduce_max_pd(best);
+
+    for &value in chunks.remainder() {
+        if !value.is_nan() {
+            max = max.max(value);
+            valid += 1;
+        }
+    }
+    (valid > 0).then_some(max)
+}
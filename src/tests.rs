@@ -9,8 +9,12 @@ use std::{
     ops::{Add, Div},
 };
 
+use crate::grouped::GroupedResampler;
+use crate::numeric::{NumericResampler, NumericResamplingFunction};
 use crate::resampler::{epoch_align, Resampler, ResamplingFunction, Sample};
+use crate::window::{Aggregator, MaxAggregator, SumAggregator, TwoStacks, WindowSegmentTree};
 use chrono::{DateTime, TimeDelta, Utc};
+use itertools::Itertools;
 use num_traits::FromPrimitive;
 
 #[derive(Debug, Clone, Default, Copy, PartialEq)]
@@ -332,6 +336,438 @@ fn test_resampling_coalesce() {
     );
 }
 
+/// Tests that the flat-buffer NumericResampler stays in lockstep with the
+/// generic Resampler for every resampling function, including with gaps,
+/// missing values, slower-than-interval input and resampling in batches.
+#[test]
+fn test_numeric_resampler_parity() {
+    let functions = [
+        (NumericResamplingFunction::Average, 0),
+        (NumericResamplingFunction::Sum, 1),
+        (NumericResamplingFunction::Max, 2),
+        (NumericResamplingFunction::Min, 3),
+        (NumericResamplingFunction::Last, 4),
+        (NumericResamplingFunction::Count, 5),
+        (NumericResamplingFunction::First, 6),
+        (NumericResamplingFunction::Coalesce, 7),
+    ];
+    let generic_function = |id: i32| -> ResamplingFunction<f64, TestSample> {
+        match id {
+            0 => ResamplingFunction::Average,
+            1 => ResamplingFunction::Sum,
+            2 => ResamplingFunction::Max,
+            3 => ResamplingFunction::Min,
+            4 => ResamplingFunction::Last,
+            5 => ResamplingFunction::Count,
+            6 => ResamplingFunction::First,
+            7 => ResamplingFunction::Coalesce,
+            _ => unreachable!(),
+        }
+    };
+
+    let start = DateTime::from_timestamp(0, 0).unwrap();
+    // Faster and slower input rates than the resampling interval.
+    for (interval, step) in [
+        (TimeDelta::seconds(2), TimeDelta::milliseconds(700)),
+        (TimeDelta::seconds(1), TimeDelta::milliseconds(2500)),
+    ] {
+        // A pseudo-random but deterministic sequence with missing values
+        // (None) and gaps (skipped timestamps).
+        let data: Vec<TestSample> = (1..=100)
+            .filter(|i| i % 17 != 0)
+            .map(|i| {
+                let value = ((i * 7) % 13) as f64;
+                TestSample::new(start + step * i, (i % 11 != 0).then_some(value))
+            })
+            .collect();
+        let (first_half, second_half) = data.split_at(60);
+
+        for (numeric_function, function_id) in functions {
+            for max_age_in_intervals in [0, 1, 2, 5] {
+                for first_timestamp in [false, true] {
+                    let mut generic = Resampler::new(
+                        interval,
+                        generic_function(function_id),
+                        max_age_in_intervals,
+                        start,
+                        first_timestamp,
+                    );
+                    let mut numeric = NumericResampler::new(
+                        interval,
+                        numeric_function,
+                        max_age_in_intervals,
+                        start,
+                        first_timestamp,
+                    );
+
+                    // Resample in two batches to also compare the state that
+                    // is carried across resample calls.
+                    for (batch, end) in [
+                        (first_half, start + step * 60),
+                        (second_half, start + step * 101),
+                    ] {
+                        for sample in batch {
+                            numeric.push(sample.timestamp(), sample.value());
+                        }
+                        generic.extend(batch.iter().copied());
+
+                        let expected: Vec<(DateTime<Utc>, Option<f64>)> = generic
+                            .resample(end)
+                            .iter()
+                            .map(|s| (s.timestamp(), s.value()))
+                            .collect();
+                        assert_eq!(
+                            numeric.resample(end),
+                            expected,
+                            "function {:?}, interval {}, step {}, max_age {}, first_timestamp {}",
+                            numeric_function,
+                            interval,
+                            step,
+                            max_age_in_intervals,
+                            first_timestamp,
+                        );
+                    }
+                }
+            }
+        }
+    }
+}
+
+#[test]
+fn test_numeric_resampler_empty_buffer() {
+    let start = DateTime::from_timestamp(0, 0).unwrap();
+    let mut resampler = NumericResampler::new(
+        TimeDelta::seconds(5),
+        NumericResamplingFunction::Average,
+        1,
+        start,
+        false,
+    );
+    assert!(resampler.is_empty());
+
+    let resampled = resampler.resample(start + TimeDelta::seconds(10));
+    assert_eq!(
+        resampled,
+        vec![
+            (start + TimeDelta::seconds(5), None),
+            (start + TimeDelta::seconds(10), None),
+        ]
+    );
+}
+
+#[test]
+fn test_simd_kernels() {
+    // Lengths around the SIMD chunk and unroll boundaries, so both the
+    // vectorized loops and the scalar tails are exercised.
+    for len in [0, 1, 3, 4, 7, 8, 15, 16, 17, 33, 100] {
+        // A pseudo-random but deterministic sequence, with some NaN holes.
+        let values: Vec<f64> = (0..len)
+            .map(|i| {
+                if i % 7 == 3 {
+                    f64::NAN
+                } else {
+                    ((i * 13 % 29) as f64) - 14.0
+                }
+            })
+            .collect();
+
+        let valid: Vec<f64> = values.iter().copied().filter(|v| !v.is_nan()).collect();
+        let expected_sum = (!valid.is_empty()).then(|| valid.iter().sum::<f64>());
+        let expected_min = valid.iter().copied().reduce(f64::min);
+        let expected_max = valid.iter().copied().reduce(f64::max);
+
+        assert_eq!(crate::simd::sum(&values), expected_sum, "sum, len {}", len);
+        assert_eq!(crate::simd::min(&values), expected_min, "min, len {}", len);
+        assert_eq!(crate::simd::max(&values), expected_max, "max, len {}", len);
+        assert_eq!(
+            crate::simd::count(&values),
+            valid.len(),
+            "count, len {}",
+            len
+        );
+    }
+
+    // All-NaN slices have no valid value to aggregate.
+    let all_nan = vec![f64::NAN; 20];
+    assert_eq!(crate::simd::sum(&all_nan), None);
+    assert_eq!(crate::simd::min(&all_nan), None);
+    assert_eq!(crate::simd::max(&all_nan), None);
+    assert_eq!(crate::simd::argmin(&all_nan), None);
+    assert_eq!(crate::simd::argmax(&all_nan), None);
+
+    // Infinities are valid values, not missing ones.
+    let infinities = [f64::NEG_INFINITY, 1.0, f64::INFINITY];
+    assert_eq!(crate::simd::min(&infinities), Some(f64::NEG_INFINITY));
+    assert_eq!(crate::simd::max(&infinities), Some(f64::INFINITY));
+}
+
+#[test]
+fn test_simd_stats() {
+    use crate::simd::{max, min, stats, sum, Stats};
+
+    for len in [0, 1, 3, 4, 7, 8, 15, 16, 17, 33, 100] {
+        let values: Vec<f64> = (0..len)
+            .map(|i| {
+                if i % 7 == 3 {
+                    f64::NAN
+                } else {
+                    ((i * 13 % 29) as f64) - 14.0
+                }
+            })
+            .collect();
+
+        // The fused sweep matches the individual kernels.
+        let result = stats(&values);
+        assert_eq!(result.sum(), sum(&values), "sum, len {}", len);
+        assert_eq!(result.min(), min(&values), "min, len {}", len);
+        assert_eq!(result.max(), max(&values), "max, len {}", len);
+        assert_eq!(
+            result.count(),
+            values.iter().filter(|v| !v.is_nan()).count(),
+            "count, len {}",
+            len
+        );
+        assert_eq!(
+            result.average(),
+            result.sum().map(|sum| sum / result.count() as f64),
+            "average, len {}",
+            len
+        );
+    }
+
+    // Merging the stats of two adjacent runs matches one pass over both.
+    let first: Vec<f64> = (0..13).map(|i| i as f64).collect();
+    let second = [f64::NAN, 7.0, -3.0];
+    let all: Vec<f64> = first.iter().chain(&second).copied().collect();
+    assert_eq!(Stats::merge(stats(&first), stats(&second)), stats(&all));
+    assert_eq!(
+        Stats::merge(Stats::default(), stats(&second)),
+        stats(&second)
+    );
+}
+
+#[test]
+fn test_simd_argmin_argmax() {
+    for len in [0, 1, 3, 4, 7, 8, 15, 16, 17, 33, 100] {
+        // A pseudo-random but deterministic sequence with repeated values
+        // (to exercise the first-occurrence tie-breaking) and NaN holes.
+        let values: Vec<f64> = (0..len)
+            .map(|i| {
+                if i % 7 == 3 {
+                    f64::NAN
+                } else {
+                    (i * 13 % 10) as f64
+                }
+            })
+            .collect();
+
+        // The expected results are the first occurrences of the extremes.
+        let mut expected_argmin: Option<usize> = None;
+        let mut expected_argmax: Option<usize> = None;
+        for (i, &v) in values.iter().enumerate() {
+            if v.is_nan() {
+                continue;
+            }
+            if expected_argmin.is_none_or(|best| v < values[best]) {
+                expected_argmin = Some(i);
+            }
+            if expected_argmax.is_none_or(|best| v > values[best]) {
+                expected_argmax = Some(i);
+            }
+        }
+
+        assert_eq!(
+            crate::simd::argmin(&values),
+            expected_argmin,
+            "argmin, len {}",
+            len
+        );
+        assert_eq!(
+            crate::simd::argmax(&values),
+            expected_argmax,
+            "argmax, len {}",
+            len
+        );
+    }
+
+    // Extreme values still get their index reported.
+    let infinities = [f64::NAN, f64::INFINITY, f64::INFINITY, f64::NEG_INFINITY];
+    assert_eq!(crate::simd::argmin(&infinities), Some(3));
+    assert_eq!(crate::simd::argmax(&infinities), Some(1));
+}
+
+#[test]
+fn test_window_segment_tree() {
+    let mut tree: WindowSegmentTree<f64, MaxAggregator<f64>> = WindowSegmentTree::with_capacity(4);
+    assert_eq!(tree.query().finish(), None);
+
+    // Push more samples than the initial capacity to exercise growing.
+    for i in 0..10 {
+        tree.push(MaxAggregator::lift(Some(i as f64)));
+        assert_eq!(tree.query().finish(), Some(i as f64));
+    }
+    // Evicting the oldest samples does not change the maximum...
+    for i in 0..9 {
+        tree.evict();
+        assert_eq!(tree.query().finish(), Some(9.0), "after evicting {}", i);
+    }
+    // ...until the maximum itself is evicted.
+    tree.evict();
+    assert_eq!(tree.query().finish(), None);
+}
+
+#[test]
+fn test_window_two_stacks() {
+    let mut stacks: TwoStacks<f64, SumAggregator<f64>> = TwoStacks::new();
+    assert_eq!(stacks.query().finish(), None);
+
+    for i in 1..=10 {
+        stacks.push(SumAggregator::lift(Some(i as f64)));
+    }
+    assert_eq!(stacks.query().finish(), Some(55.0));
+
+    // Evicting triggers a flip of the back stack into the front stack.
+    stacks.evict();
+    assert_eq!(stacks.query().finish(), Some(54.0));
+
+    // Mixing new samples with further evictions keeps the aggregate right.
+    stacks.push(SumAggregator::lift(Some(100.0)));
+    stacks.push(SumAggregator::lift(None));
+    assert_eq!(stacks.query().finish(), Some(154.0));
+    for expected in [152.0, 149.0, 145.0, 140.0, 134.0, 127.0, 119.0, 110.0] {
+        stacks.evict();
+        assert_eq!(stacks.query().finish(), Some(expected));
+    }
+}
+
+/// Tests that Sum/Average/Count through the two-stacks window match a naive
+/// rescan of the window.
+#[test]
+fn test_resampling_sum_average_count_window() {
+    let start = DateTime::from_timestamp(0, 0).unwrap();
+    let step = TimeDelta::seconds(1);
+    let data: Vec<TestSample> = (1..=100)
+        .map(|i| {
+            // A pseudo-random but deterministic sequence, with some gaps.
+            let value = ((i * 7) % 13) as f64;
+            TestSample::new(start + step * i, (i % 11 != 0).then_some(value))
+        })
+        .collect();
+
+    type FunctionPair = (
+        fn() -> ResamplingFunction<f64, TestSample>,
+        fn() -> ResamplingFunction<f64, TestSample>,
+    );
+    let function_pairs: [FunctionPair; 3] = [
+        (
+            || ResamplingFunction::Sum,
+            || {
+                ResamplingFunction::Custom(Box::new(|samples: &[&TestSample]| {
+                    samples.iter().filter_map(|s| s.value()).sum1()
+                }))
+            },
+        ),
+        (
+            || ResamplingFunction::Average,
+            || {
+                ResamplingFunction::Custom(Box::new(|samples: &[&TestSample]| {
+                    let count = samples.iter().filter_map(|s| s.value()).count();
+                    samples
+                        .iter()
+                        .filter_map(|s| s.value())
+                        .sum1::<f64>()
+                        .map(|sum| sum / count as f64)
+                }))
+            },
+        ),
+        (
+            || ResamplingFunction::Count,
+            || {
+                ResamplingFunction::Custom(Box::new(|samples: &[&TestSample]| {
+                    Some(samples.iter().filter_map(|s| s.value()).count() as f64)
+                }))
+            },
+        ),
+    ];
+
+    for (window_function, naive_function) in function_pairs {
+        for max_age_in_intervals in [1, 3] {
+            let mut window_resampler: Resampler<f64, TestSample> = Resampler::new(
+                TimeDelta::seconds(5),
+                window_function(),
+                max_age_in_intervals,
+                start,
+                false,
+            );
+            let mut naive_resampler: Resampler<f64, TestSample> = Resampler::new(
+                TimeDelta::seconds(5),
+                naive_function(),
+                max_age_in_intervals,
+                start,
+                false,
+            );
+
+            window_resampler.extend(data.clone());
+            naive_resampler.extend(data.clone());
+
+            assert_eq!(
+                window_resampler.resample(start + step * 100),
+                naive_resampler.resample(start + step * 100),
+            );
+        }
+    }
+}
+
+/// Tests that Max/Min over a window large enough to use the segment tree
+/// match a naive rescan of the window.
+#[test]
+fn test_resampling_min_max_with_large_window() {
+    let start = DateTime::from_timestamp(0, 0).unwrap();
+    let step = TimeDelta::seconds(1);
+    let data: Vec<TestSample> = (1..=100)
+        .map(|i| {
+            // A pseudo-random but deterministic sequence, with some gaps.
+            let value = ((i * 7) % 13) as f64;
+            TestSample::new(start + step * i, (i % 11 != 0).then_some(value))
+        })
+        .collect();
+
+    let naive_max = ResamplingFunction::Custom(Box::new(|samples: &[&TestSample]| {
+        samples
+            .iter()
+            .filter_map(|s| s.value())
+            .fold(None, |acc: Option<f64>, v| {
+                Some(acc.map_or(v, |acc| acc.max(v)))
+            })
+    }));
+    let naive_min = ResamplingFunction::Custom(Box::new(|samples: &[&TestSample]| {
+        samples
+            .iter()
+            .filter_map(|s| s.value())
+            .fold(None, |acc: Option<f64>, v| {
+                Some(acc.map_or(v, |acc| acc.min(v)))
+            })
+    }));
+
+    for (tree_function, naive_function) in [
+        (ResamplingFunction::Max, naive_max),
+        (ResamplingFunction::Min, naive_min),
+    ] {
+        let mut tree_resampler: Resampler<f64, TestSample> =
+            Resampler::new(TimeDelta::seconds(5), tree_function, 32, start, false);
+        let mut naive_resampler: Resampler<f64, TestSample> =
+            Resampler::new(TimeDelta::seconds(5), naive_function, 32, start, false);
+
+        tree_resampler.extend(data.clone());
+        naive_resampler.extend(data.clone());
+
+        assert_eq!(
+            tree_resampler.resample(start + step * 100),
+            naive_resampler.resample(start + step * 100),
+        );
+    }
+}
+
 #[test]
 fn test_resampling_custom() {
     test_resampling(
@@ -871,3 +1307,95 @@ fn test_resampling_non_primitive_sum() {
     ];
     assert_eq!(resampled, expected);
 }
+
+#[test]
+fn test_grouped_resampler() {
+    let start = DateTime::from_timestamp(0, 0).unwrap();
+    let step = TimeDelta::seconds(1);
+    let mut grouped: GroupedResampler<&str> = GroupedResampler::new(
+        TimeDelta::seconds(5),
+        NumericResamplingFunction::Average,
+        1,
+        start,
+        false,
+    );
+    let mut meter = NumericResampler::new(
+        TimeDelta::seconds(5),
+        NumericResamplingFunction::Average,
+        1,
+        start,
+        false,
+    );
+    let mut inverter = NumericResampler::new(
+        TimeDelta::seconds(5),
+        NumericResamplingFunction::Average,
+        1,
+        start,
+        false,
+    );
+
+    assert!(grouped.is_empty());
+    for i in 1..=10 {
+        grouped.push("meter", start + step * i, Some(f64::from(i)));
+        grouped.push("inverter", start + step * i, Some(f64::from(i * 2)));
+        meter.push(start + step * i, Some(f64::from(i)));
+        inverter.push(start + step * i, Some(f64::from(i * 2)));
+    }
+    assert_eq!(grouped.len(), 2);
+
+    let resampled = grouped.resample(start + step * 10);
+    assert_eq!(resampled.len(), 2);
+    assert_eq!(resampled[&"meter"], meter.resample(start + step * 10));
+    assert_eq!(resampled[&"inverter"], inverter.resample(start + step * 10));
+
+    // A key appearing after a resample starts at the end of that resample,
+    // so its buckets stay aligned with the existing streams.
+    grouped.push("battery", start + step * 11, Some(1.0));
+    grouped.push("meter", start + step * 11, Some(11.0));
+    let resampled = grouped.resample(start + step * 15);
+    assert_eq!(resampled.len(), 3);
+    assert_eq!(resampled[&"battery"], vec![(start + step * 15, Some(1.0))]);
+    assert_eq!(resampled[&"meter"], vec![(start + step * 15, Some(11.0))]);
+}
+
+#[test]
+fn test_numeric_resampler_long_window_chunked() {
+    // Windows of several hundred samples take the chunked path that merges
+    // precomputed per-chunk statistics; compare it against the generic
+    // resampler, which scans or incrementally maintains every sample.
+    let start = DateTime::from_timestamp(0, 0).unwrap();
+    let interval = TimeDelta::seconds(1);
+    let step = TimeDelta::milliseconds(3);
+    let end = start + interval * 9;
+    for function in [
+        NumericResamplingFunction::Average,
+        NumericResamplingFunction::Sum,
+        NumericResamplingFunction::Max,
+        NumericResamplingFunction::Min,
+        NumericResamplingFunction::Count,
+    ] {
+        let generic_function = match function {
+            NumericResamplingFunction::Average => ResamplingFunction::Average,
+            NumericResamplingFunction::Sum => ResamplingFunction::Sum,
+            NumericResamplingFunction::Max => ResamplingFunction::Max,
+            NumericResamplingFunction::Min => ResamplingFunction::Min,
+            NumericResamplingFunction::Count => ResamplingFunction::Count,
+            _ => unreachable!(),
+        };
+        let mut numeric = NumericResampler::new(interval, function, 2, start, false);
+        let mut generic: Resampler<f64, TestSample> =
+            Resampler::new(interval, generic_function, 2, start, false);
+        for i in 0..3000 {
+            let value = (i % 11 != 0).then_some(((i * 13) % 37) as f64);
+            numeric.push(start + step * i, value);
+            generic.push(TestSample::new(start + step * i, value));
+        }
+        let resampled = numeric.resample(end);
+        let expected: Vec<_> = generic
+            .resample(end)
+            .into_iter()
+            .map(|s| (s.timestamp(), s.value()))
+            .collect();
+        assert_eq!(resampled, expected, "function: {function:?}");
+    }
+}
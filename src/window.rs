@@ -0,0 +1,382 @@
+// License: MIT
+// Copyright © 2024 Frequenz Energy-as-a-Service GmbH
+
+//! The window module provides incrementally maintained sliding-window
+//! aggregates that the resampler uses instead of rescanning the samples of a
+//! window for every emitted interval.
+
+use num_traits::FromPrimitive;
+use std::cmp::Ordering;
+use std::fmt::Debug;
+use std::iter::{once, Sum};
+use std::marker::PhantomData;
+use std::ops::Div;
+
+/// A partial aggregate over a run of samples that can be merged with the
+/// partial aggregate of an adjacent run.
+///
+/// The [`Default`] value must be the identity of [`merge`][Aggregator::merge],
+/// i.e. merging it with any aggregate must leave the other aggregate
+/// unchanged.
+pub(crate) trait Aggregator<T>: Clone + Default {
+    /// Lifts a single sample value into a partial aggregate.
+    fn lift(value: Option<T>) -> Self;
+
+    /// Merges the partial aggregates of two adjacent runs of samples.
+    fn merge(a: Self, b: Self) -> Self;
+
+    /// Finishes the aggregation, returning the aggregated value.
+    fn finish(self) -> Option<T>;
+}
+
+/// The partial aggregate for [`ResamplingFunction::Max`][crate::ResamplingFunction::Max].
+#[derive(Clone, Debug, Default)]
+pub(crate) struct MaxAggregator<T>(Option<T>);
+
+impl<T: PartialOrd + Default + Clone> Aggregator<T> for MaxAggregator<T> {
+    fn lift(value: Option<T>) -> Self {
+        Self(value)
+    }
+
+    fn merge(a: Self, b: Self) -> Self {
+        match (a.0, b.0) {
+            (Some(a), Some(b)) => {
+                let ordering = a.partial_cmp(&b).unwrap_or_else(|| {
+                    if a.partial_cmp(&T::default()).is_some() {
+                        Ordering::Greater
+                    } else {
+                        Ordering::Less
+                    }
+                });
+                Self(Some(if ordering == Ordering::Less { b } else { a }))
+            }
+            (Some(a), None) => Self(Some(a)),
+            (None, b) => Self(b),
+        }
+    }
+
+    fn finish(self) -> Option<T> {
+        self.0
+    }
+}
+
+/// The partial aggregate for [`ResamplingFunction::Min`][crate::ResamplingFunction::Min].
+#[derive(Clone, Debug, Default)]
+pub(crate) struct MinAggregator<T>(Option<T>);
+
+impl<T: PartialOrd + Default + Clone> Aggregator<T> for MinAggregator<T> {
+    fn lift(value: Option<T>) -> Self {
+        Self(value)
+    }
+
+    fn merge(a: Self, b: Self) -> Self {
+        match (a.0, b.0) {
+            (Some(a), Some(b)) => {
+                let ordering = a.partial_cmp(&b).unwrap_or_else(|| {
+                    if a.partial_cmp(&T::default()).is_some() {
+                        Ordering::Less
+                    } else {
+                        Ordering::Greater
+                    }
+                });
+                Self(Some(if ordering == Ordering::Greater { b } else { a }))
+            }
+            (Some(a), None) => Self(Some(a)),
+            (None, b) => Self(b),
+        }
+    }
+
+    fn finish(self) -> Option<T> {
+        self.0
+    }
+}
+
+/// The partial aggregate for [`ResamplingFunction::Sum`][crate::ResamplingFunction::Sum].
+#[derive(Clone, Debug, Default)]
+pub(crate) struct SumAggregator<T>(Option<T>);
+
+impl<T: Sum + Default + Clone> Aggregator<T> for SumAggregator<T> {
+    fn lift(value: Option<T>) -> Self {
+        Self(value)
+    }
+
+    fn merge(a: Self, b: Self) -> Self {
+        match (a.0, b.0) {
+            (Some(a), Some(b)) => Self(Some(once(a).chain(once(b)).sum())),
+            (Some(a), None) => Self(Some(a)),
+            (None, b) => Self(b),
+        }
+    }
+
+    fn finish(self) -> Option<T> {
+        self.0
+    }
+}
+
+/// The partial aggregate for [`ResamplingFunction::Count`][crate::ResamplingFunction::Count].
+#[derive(Clone, Debug, Default)]
+pub(crate) struct CountAggregator<T> {
+    count: usize,
+    _value: PhantomData<T>,
+}
+
+impl<T: FromPrimitive + Default + Clone> Aggregator<T> for CountAggregator<T> {
+    fn lift(value: Option<T>) -> Self {
+        Self {
+            count: value.is_some() as usize,
+            _value: PhantomData,
+        }
+    }
+
+    fn merge(a: Self, b: Self) -> Self {
+        Self {
+            count: a.count + b.count,
+            _value: PhantomData,
+        }
+    }
+
+    fn finish(self) -> Option<T> {
+        Some(T::from_usize(self.count).unwrap_or_else(|| T::default()))
+    }
+}
+
+/// The partial aggregate for
+/// [`ResamplingFunction::Average`][crate::ResamplingFunction::Average],
+/// carrying the sum and the count of the non-`None` samples.
+#[derive(Clone, Debug, Default)]
+pub(crate) struct AverageAggregator<T> {
+    sum: Option<T>,
+    count: usize,
+}
+
+impl<T: Sum + Div<Output = T> + FromPrimitive + Default + Clone> Aggregator<T>
+    for AverageAggregator<T>
+{
+    fn lift(value: Option<T>) -> Self {
+        Self {
+            count: value.is_some() as usize,
+            sum: value,
+        }
+    }
+
+    fn merge(a: Self, b: Self) -> Self {
+        Self {
+            sum: SumAggregator::merge(SumAggregator(a.sum), SumAggregator(b.sum)).0,
+            count: a.count + b.count,
+        }
+    }
+
+    fn finish(self) -> Option<T> {
+        self.sum
+            .map(|sum| sum.div(T::from_usize(self.count).unwrap_or_else(|| T::default())))
+    }
+}
+
+/// A FIFO sliding window that maintains its aggregate in a segment tree.
+///
+/// The leaves of the tree hold the per-sample partial aggregates in a
+/// power-of-two ring buffer and every inner node holds the merge of its two
+/// children, so pushing and evicting a sample costs O(log W) merges while
+/// querying the window aggregate is a O(1) read of the root. This is what
+/// makes non-invertible aggregates like Max/Min affordable over large
+/// windows, where recomputing the aggregate from scratch for every emitted
+/// interval would be O(W).
+///
+/// Evicted leaves are reset to the merge identity, so the root stays the
+/// aggregate of exactly the live leaves.
+#[derive(Debug)]
+pub(crate) struct WindowSegmentTree<T, A: Aggregator<T>> {
+    /// The tree nodes; the `capacity` leaves live at `capacity..2 * capacity`
+    /// and node 0 is unused, so the parent of node `i` is `i / 2`.
+    tree: Vec<A>,
+    /// The number of leaves; always a power of two.
+    capacity: usize,
+    /// The leaf ring index of the oldest sample in the window.
+    head: usize,
+    /// The number of samples currently in the window.
+    len: usize,
+    _value: PhantomData<T>,
+}
+
+impl<T, A: Aggregator<T>> WindowSegmentTree<T, A> {
+    /// Creates a new tree with room for at least `capacity` samples.
+    pub(crate) fn with_capacity(capacity: usize) -> Self {
+        let capacity = capacity.max(1).next_power_of_two();
+        Self {
+            tree: vec![A::default(); 2 * capacity],
+            capacity,
+            head: 0,
+            len: 0,
+            _value: PhantomData,
+        }
+    }
+
+    /// Pushes the partial aggregate of the newest sample into the window.
+    pub(crate) fn push(&mut self, aggregate: A) {
+        if self.len == self.capacity {
+            self.grow();
+        }
+        let leaf = (self.head + self.len) & (self.capacity - 1);
+        self.tree[self.capacity + leaf] = aggregate;
+        self.len += 1;
+        self.update(leaf);
+    }
+
+    /// Evicts the oldest sample from the window.
+    pub(crate) fn evict(&mut self) {
+        if self.len == 0 {
+            return;
+        }
+        let leaf = self.head;
+        self.tree[self.capacity + leaf] = A::default();
+        self.update(leaf);
+        self.head = (self.head + 1) & (self.capacity - 1);
+        self.len -= 1;
+    }
+
+    /// Returns the aggregate of all samples currently in the window.
+    pub(crate) fn query(&self) -> A {
+        self.tree[1].clone()
+    }
+
+    /// Re-merges all nodes on the path from the given leaf to the root.
+    fn update(&mut self, leaf: usize) {
+        let mut node = (self.capacity + leaf) / 2;
+        while node >= 1 {
+            self.tree[node] =
+                A::merge(self.tree[2 * node].clone(), self.tree[2 * node + 1].clone());
+            node /= 2;
+        }
+    }
+
+    /// Doubles the capacity of the tree, re-inserting the live leaves.
+    fn grow(&mut self) {
+        let mut bigger = Self::with_capacity(self.capacity * 2);
+        for i in 0..self.len {
+            let leaf = (self.head + i) & (self.capacity - 1);
+            bigger.push(self.tree[self.capacity + leaf].clone());
+        }
+        *self = bigger;
+    }
+}
+
+/// A FIFO sliding window that maintains its aggregate with the two-stacks
+/// algorithm, in amortized O(1) merges per sample.
+///
+/// New samples go onto the back stack, whose running aggregate is kept in
+/// `back_aggregate`. Evictions pop the front stack, which holds the
+/// aggregates of every suffix of the older samples; when it runs empty the
+/// back stack is flipped into it, rebuilding the suffix aggregates. Each
+/// sample is merged at most twice in total, so unlike a per-interval rescan
+/// the cost does not grow with the window length, and unlike subtracting
+/// evicted samples from a running sum it does not accumulate floating-point
+/// drift and works for any associative aggregate.
+#[derive(Debug)]
+pub(crate) struct TwoStacks<T, A: Aggregator<T>> {
+    /// The older samples; element `i` holds the aggregate of the samples from
+    /// `i` to the end of the stack (the oldest sample is at the top).
+    front: Vec<A>,
+    /// The per-sample aggregates of the newer samples, in arrival order.
+    back: Vec<A>,
+    /// The aggregate of all samples in `back`.
+    back_aggregate: A,
+    _value: PhantomData<T>,
+}
+
+impl<T, A: Aggregator<T>> TwoStacks<T, A> {
+    /// Creates a new, empty window.
+    pub(crate) fn new() -> Self {
+        Self {
+            front: vec![],
+            back: vec![],
+            back_aggregate: A::default(),
+            _value: PhantomData,
+        }
+    }
+
+    /// Pushes the partial aggregate of the newest sample into the window.
+    pub(crate) fn push(&mut self, aggregate: A) {
+        self.back_aggregate = A::merge(self.back_aggregate.clone(), aggregate.clone());
+        self.back.push(aggregate);
+    }
+
+    /// Evicts the oldest sample from the window.
+    pub(crate) fn evict(&mut self) {
+        if self.front.is_empty() {
+            // Flip: turn the back stack into the suffix aggregates of the
+            // front stack, newest first so the oldest ends up on top.
+            let mut suffix = A::default();
+            while let Some(aggregate) = self.back.pop() {
+                suffix = A::merge(aggregate, suffix);
+                self.front.push(suffix.clone());
+            }
+            self.back_aggregate = A::default();
+        }
+        self.front.pop();
+    }
+
+    /// Returns the aggregate of all samples currently in the window.
+    pub(crate) fn query(&self) -> A {
+        match self.front.last() {
+            Some(front) => A::merge(front.clone(), self.back_aggregate.clone()),
+            None => self.back_aggregate.clone(),
+        }
+    }
+}
+
+/// An incrementally maintained sliding window for one of the resampling
+/// functions, dispatching to the aggregate structure that fits the function.
+#[derive(Debug)]
+pub(crate) enum SlidingWindow<
+    T: Div<Output = T> + Sum + PartialOrd + FromPrimitive + Default + Clone,
+> {
+    /// A segment-tree window for [`ResamplingFunction::Max`][crate::ResamplingFunction::Max].
+    Max(WindowSegmentTree<T, MaxAggregator<T>>),
+    /// A segment-tree window for [`ResamplingFunction::Min`][crate::ResamplingFunction::Min].
+    Min(WindowSegmentTree<T, MinAggregator<T>>),
+    /// A two-stacks window for [`ResamplingFunction::Sum`][crate::ResamplingFunction::Sum].
+    Sum(TwoStacks<T, SumAggregator<T>>),
+    /// A two-stacks window for
+    /// [`ResamplingFunction::Average`][crate::ResamplingFunction::Average].
+    Average(TwoStacks<T, AverageAggregator<T>>),
+    /// A two-stacks window for
+    /// [`ResamplingFunction::Count`][crate::ResamplingFunction::Count].
+    Count(TwoStacks<T, CountAggregator<T>>),
+}
+
+impl<T: Div<Output = T> + Sum + PartialOrd + FromPrimitive + Default + Clone + Debug>
+    SlidingWindow<T>
+{
+    /// Pushes the newest sample value into the window.
+    pub(crate) fn push(&mut self, value: Option<T>) {
+        match self {
+            Self::Max(tree) => tree.push(MaxAggregator::lift(value)),
+            Self::Min(tree) => tree.push(MinAggregator::lift(value)),
+            Self::Sum(stacks) => stacks.push(SumAggregator::lift(value)),
+            Self::Average(stacks) => stacks.push(AverageAggregator::lift(value)),
+            Self::Count(stacks) => stacks.push(CountAggregator::lift(value)),
+        }
+    }
+
+    /// Evicts the oldest sample value from the window.
+    pub(crate) fn evict(&mut self) {
+        match self {
+            Self::Max(tree) => tree.evict(),
+            Self::Min(tree) => tree.evict(),
+            Self::Sum(stacks) => stacks.evict(),
+            Self::Average(stacks) => stacks.evict(),
+            Self::Count(stacks) => stacks.evict(),
+        }
+    }
+
+    /// Returns the aggregated value of all samples currently in the window.
+    pub(crate) fn query(&self) -> Option<T> {
+        match self {
+            Self::Max(tree) => tree.query().finish(),
+            Self::Min(tree) => tree.query().finish(),
+            Self::Sum(stacks) => stacks.query().finish(),
+            Self::Average(stacks) => stacks.query().finish(),
+            Self::Count(stacks) => stacks.query().finish(),
+        }
+    }
+}
@@ -5,7 +5,14 @@
 
 import datetime as dt
 
-from frequenz.resampling import Resampler, ResamplingFunction
+import numpy as np
+from frequenz.resampling import (
+    Resampler,
+    ResamplingFunction,
+    timestamp_range_to_nanoseconds,
+    timestamp_to_nanoseconds,
+    timestamps_to_nanoseconds,
+)
 
 
 def test_resampler_resampling_function_average() -> None:
@@ -33,6 +40,123 @@ def test_resampler_resampling_function_average() -> None:
     assert resampled == expected
 
 
+def test_timestamp_range_to_nanoseconds() -> None:
+    """Test the vectorized timestamp range helper."""
+    start = dt.datetime(2024, 3, 1, tzinfo=dt.timezone.utc)
+    step = dt.timedelta(milliseconds=200)
+
+    expected = timestamps_to_nanoseconds(start + i * step for i in range(25))
+
+    assert np.array_equal(timestamp_range_to_nanoseconds(start, step, 25), expected)
+    assert len(timestamp_range_to_nanoseconds(start, step, 0)) == 0
+
+
+def test_resampler_push_sample_ns() -> None:
+    """Test pushing samples with nanosecond timestamps and NaN values."""
+    start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+    step = dt.timedelta(seconds=1)
+    resampler = Resampler(
+        dt.timedelta(seconds=5),
+        ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=start,
+        first_timestamp=False,
+    )
+
+    for i in range(1, 11):
+        resampler.push_sample_ns(
+            timestamp_ns=timestamp_to_nanoseconds(start + i * step),
+            value=float("nan") if i > 5 else float(i),
+        )
+
+    expected = [
+        (start + 5 * step, 3.0),
+        (start + 10 * step, None),
+    ]
+
+    resampled = resampler.resample(start + 10 * step)
+
+    assert resampled == expected
+
+
+def test_resampler_push_samples() -> None:
+    """Test pushing a batch of samples in a single call."""
+    start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+    step = dt.timedelta(seconds=1)
+    resampler = Resampler(
+        dt.timedelta(seconds=5),
+        ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=start,
+        first_timestamp=False,
+    )
+
+    timestamps = timestamp_range_to_nanoseconds(start + step, step, 10)
+    values = np.arange(1.0, 11.0)
+    resampler.push_samples(timestamps=timestamps, values=values)
+
+    expected = [
+        (start + 5 * step, 3.0),
+        (start + 10 * step, 8.0),
+    ]
+
+    resampled = resampler.resample(start + 10 * step)
+
+    assert resampled == expected
+
+
+def test_resampler_push_samples_nan_is_none() -> None:
+    """Test that NaN values in a batch are treated as missing samples."""
+    start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+    step = dt.timedelta(seconds=1)
+    resampler = Resampler(
+        dt.timedelta(seconds=5),
+        ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=start,
+        first_timestamp=False,
+    )
+
+    timestamps = timestamp_range_to_nanoseconds(start + step, step, 10)
+    values = np.full(10, np.nan)
+    resampler.push_samples(timestamps=timestamps, values=values)
+
+    expected = [
+        (start + 5 * step, None),
+        (start + 10 * step, None),
+    ]
+
+    resampled = resampler.resample(start + 10 * step)
+
+    assert resampled == expected
+
+
+def test_resampler_resample_arrays() -> None:
+    """Test resampling into NumPy arrays."""
+    start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+    step = dt.timedelta(seconds=1)
+    resampler = Resampler(
+        dt.timedelta(seconds=5),
+        ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=start,
+        first_timestamp=False,
+    )
+
+    for i in range(1, 11):
+        value = None if i > 5 else float(i)
+        resampler.push_sample(timestamp=start + i * step, value=value)
+
+    timestamps, values = resampler.resample_arrays(start + 10 * step)
+
+    expected_timestamps = timestamps_to_nanoseconds(
+        (start + 5 * step, start + 10 * step)
+    )
+    assert np.array_equal(timestamps, expected_timestamps)
+    assert values[0] == 3.0
+    assert np.isnan(values[1])
+
+
 def test_resampler_resampling_function_sum() -> None:
     """Test the resampler."""
     start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
@@ -332,6 +456,65 @@ def test_resampler_first_timestamp() -> None:
     assert resampled == expected
 
 
+def test_python_backend_fallback() -> None:
+    """Test that the pure-Python backend matches the default backend."""
+    # pylint: disable=import-outside-toplevel
+    from frequenz.resampling import _python_backend
+
+    start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)
+    step = dt.timedelta(seconds=1)
+    resampler = Resampler(
+        dt.timedelta(seconds=5),
+        ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=start,
+        first_timestamp=False,
+    )
+    fallback = _python_backend.Resampler(
+        dt.timedelta(seconds=5),
+        _python_backend.ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=start,
+        first_timestamp=False,
+    )
+
+    for i in range(1, 11):
+        value = None if i % 4 == 0 else float(i)
+        resampler.push_sample(timestamp=start + i * step, value=value)
+        fallback.push_sample(timestamp=start + i * step, value=value)
+
+    assert fallback.resample(start + 10 * step) == resampler.resample(start + 10 * step)
+    assert _python_backend.ResamplingFunction.values() == ResamplingFunction.values()
+    assert _python_backend.ResamplingFunction.members() == ResamplingFunction.members()
+
+    # A pre-epoch start must align toward zero like the Rust backend, not
+    # floor, so no extra leading bucket is emitted.
+    pre_epoch = dt.datetime(1969, 12, 31, 23, 59, 57, 500_000, tzinfo=dt.timezone.utc)
+    pre_resampler = Resampler(
+        step,
+        ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=pre_epoch,
+        first_timestamp=False,
+    )
+    pre_fallback = _python_backend.Resampler(
+        step,
+        _python_backend.ResamplingFunction.Average,
+        max_age_in_intervals=1,
+        start=pre_epoch,
+        first_timestamp=False,
+    )
+    for i in range(1, 4):
+        pre_resampler.push_sample(timestamp=pre_epoch + i * step, value=float(i))
+        pre_fallback.push_sample(timestamp=pre_epoch + i * step, value=float(i))
+    resampled = pre_fallback.resample(pre_epoch + 3 * step)
+    assert resampled == pre_resampler.resample(pre_epoch + 3 * step)
+    assert len(resampled) == 3
+    assert resampled[0][0] == dt.datetime(
+        1969, 12, 31, 23, 59, 59, tzinfo=dt.timezone.utc
+    )
+
+
 def test_resampler_last_timestamp() -> None:
     """Test the resampler with the last timestamp."""
     start = dt.datetime(1970, 1, 1, tzinfo=dt.timezone.utc)